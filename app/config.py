@@ -4,6 +4,53 @@ class Settings(BaseSettings):
     # existing fields
     api_key: str = "dev-key"
     database_url: str = "sqlite:///app.db"
+    # optional read replica for GET traffic; unset -> a second read-only pool on the
+    # same SQLite file (WAL), or the primary engine for other databases
+    read_database_url: str | None = None
+
+    # SQLite tuning: "default" (SQLite defaults) | "production" (WAL, synchronous=NORMAL,
+    # mmap, page cache, busy_timeout, foreign keys, sized pools) — see deps.sqlite_pragmas
+    sqlite_profile: str = "default"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_foreign_keys: bool = True
+    sqlite_pool_size: int = 4
+    sqlite_read_pool_size: int = 16
+    # shared outbound HTTP client (app.http_client) used by the reference scraper
+    http_pool_size: int = 100
+    http_pool_per_host: int = 8
+    http_dns_ttl_s: int = 300
+    http_keepalive_s: float = 30.0
+    http_timeout_s: float = 10.0
+    http_verify_ssl: bool = False
+    # scraped URL metadata cache (services.url_cache): in-process LRU + url_metadata table
+    url_cache_ttl_s: int = 7 * 24 * 3600
+    url_cache_negative_ttl_s: int = 3600
+    url_cache_lru_size: int = 2048
+    # background reference enrichment (services.enrichment)
+    enrich_workers: int = 4
+    enrich_max_attempts: int = 4
+    enrich_backoff_s: float = 2.0
+    # a claimed reference is left to its process for this long (then any process may requeue it)
+    enrich_lease_s: int = 600
+    # local content-addressed thumbnail store (services.thumbnails)
+    thumbnail_dir: str = "thumbnails"
+    thumbnail_max_bytes: int = 5 * 1024 * 1024
+    thumbnail_cache_max_mb: int = 1024
+    # scheduled provider syncs (app.jobs): thread pool size, and per-provider caps
+    sync_workers: int = 8
+    youtube_sync_concurrency: int = 4
+    instagram_sync_concurrency: int = 4
+    # nightly schedule (Asia/Kolkata): first provider at sync_schedule_start ("HH:MM"),
+    # each next registered provider sync_stagger_minutes later
+    sync_schedule_start: str = "03:05"
+    sync_stagger_minutes: int = 30
+    # POST /references/bulk: scrapes in flight at once (per host: http_pool_per_host)
+    bulk_scrape_concurrency: int = 16
+    # run create_all + pending migrations at boot; set false when `python -m app.migrations`
+    # is run once per deploy so workers only do the schema-version check
+    migrate_on_startup: bool = True
 
     # OAuth (optional for dev)
     google_client_id: str | None = None
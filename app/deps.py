@@ -1,11 +1,104 @@
 from fastapi import Header, HTTPException
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from .config import settings
 
-# Use the consistent property name from settings
-engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
+def async_database_url(url: str) -> str:
+    """Same database through an async driver: sqlite -> aiosqlite, postgresql -> asyncpg."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        return u.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
+
+def _is_file_sqlite(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and u.database not in (None, "", ":memory:")
+
+# ---- SQLite connection profile (settings.sqlite_profile) ----
+
+def sqlite_pragmas(profile: str, read_only: bool = False) -> list[str]:
+    """
+    PRAGMAs run on every new SQLite connection. "production" enables WAL with
+    synchronous=NORMAL, mmap, a larger page cache, busy_timeout and foreign keys;
+    "default" keeps SQLite defaults (readers still get WAL so they don't block the writer).
+    """
+    if profile == "production":
+        pragmas = [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+            f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}",
+            f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+            f"PRAGMA foreign_keys={'ON' if settings.sqlite_foreign_keys else 'OFF'}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    else:
+        pragmas = ["PRAGMA journal_mode=WAL"] if read_only else []
+    if read_only:
+        # query_only guards the read pool against stray writes
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+def _apply_pragmas(engine, pragmas: list[str]) -> None:
+    if not pragmas:
+        return
+
+    def _on_connect(dbapi_connection, connection_record):
+        cur = dbapi_connection.cursor()
+        for pragma in pragmas:
+            if pragma == "PRAGMA journal_mode=WAL":
+                # journal_mode is persistent; switching ignores busy_timeout, so
+                # only do it when needed (otherwise new pool connections can hit "locked")
+                cur.execute("PRAGMA journal_mode")
+                if str(cur.fetchone()[0]).lower() == "wal":
+                    continue
+            cur.execute(pragma)
+        cur.close()
+
+    event.listen(engine.sync_engine if hasattr(engine, "sync_engine") else engine, "connect", _on_connect)
+
+def _engine_kwargs(url: str, read_only: bool) -> dict:
+    kwargs = {"pool_pre_ping": True}
+    if _is_file_sqlite(url) and settings.sqlite_profile == "production":
+        # one writer at a time in SQLite: a small write pool, a wider read pool
+        size = settings.sqlite_read_pool_size if read_only else settings.sqlite_pool_size
+        kwargs.update(pool_size=size, max_overflow=size, pool_timeout=settings.sqlite_busy_timeout_ms / 1000)
+    return kwargs
+
+def make_engines(url: str, read_only: bool = False):
+    """(sync_engine, async_engine) for url, with the SQLite profile applied."""
+    sync_eng = create_engine(url, future=True, **_engine_kwargs(url, read_only))
+    async_eng = create_async_engine(async_database_url(url), **_engine_kwargs(url, read_only))
+    if _is_file_sqlite(url):
+        pragmas = sqlite_pragmas(settings.sqlite_profile, read_only=read_only)
+        _apply_pragmas(sync_eng, pragmas)
+        _apply_pragmas(async_eng, pragmas)
+    return sync_eng, async_eng
+
+# Use the consistent property name from settings.
+# Async engine is for `async def` routes, so DB I/O doesn't block the event loop.
+engine, async_engine = make_engines(settings.database_url)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# ---- read routing: GET endpoints use these; writes and read-your-own-writes stay on the primary ----
+
+if settings.read_database_url:
+    read_engine, async_read_engine = make_engines(settings.read_database_url)
+elif _is_file_sqlite(settings.database_url):
+    # second pool on the same SQLite file (WAL, query_only)
+    read_engine, async_read_engine = make_engines(settings.database_url, read_only=True)
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+
+ReadSessionLocal = sessionmaker(bind=read_engine, autocommit=False, autoflush=False)
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
 
 def get_db() -> Session:
     db = SessionLocal()
@@ -14,6 +107,21 @@ def get_db() -> Session:
     finally:
         db.close()
 
+def get_read_db() -> Session:
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db() -> AsyncSession:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db() -> AsyncSession:
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 def require_api_key(x_api_key: str | None = Header(default=None)):
     if not x_api_key or x_api_key != settings.api_key:
         raise HTTPException(status_code=401, detail="Invalid API key")
\ No newline at end of file
@@ -0,0 +1,61 @@
+import asyncio
+import ssl
+import aiohttp
+from .config import settings
+
+# One aiohttp session for all outbound scraping: pooled keep-alive connections,
+# cached DNS and reused TLS state instead of a new connector per URL.
+# Opened/closed by the app startup/shutdown hooks (see main.py); one session per
+# event loop, so anything else that uses it must close it when done.
+
+_session: aiohttp.ClientSession | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+def _ssl_context() -> ssl.SSLContext:
+    ctx = ssl.create_default_context()
+    if not settings.http_verify_ssl:
+        # dev default: don't verify certificates (matches the old scraper)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+def _new_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        ssl=_ssl_context(),
+        limit=settings.http_pool_size,
+        limit_per_host=settings.http_pool_per_host,
+        ttl_dns_cache=settings.http_dns_ttl_s,
+        keepalive_timeout=settings.http_keepalive_s,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=settings.http_timeout_s),
+        headers={"User-Agent": "Mozilla/5.0 (compatible; Hachico/1.0)"},
+    )
+
+async def start_http_client() -> aiohttp.ClientSession:
+    return get_http_session()
+
+async def close_http_client() -> None:
+    global _session, _loop
+    session, _session, _loop = _session, None, None
+    if session is not None and not session.closed:
+        await session.close()
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    The shared session. The app opens it on startup and closes it on shutdown;
+    scripts and benches running without the app get one on first use and must
+    await close_http_client() before their event loop ends.
+    """
+    global _session, _loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed:
+        _session = _new_session()
+        _loop = loop
+    elif _loop is not loop:
+        raise RuntimeError(
+            "shared HTTP session belongs to another event loop; "
+            "await close_http_client() before that loop ends"
+        )
+    return _session
@@ -1,35 +1,148 @@
 import os
+import time
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from sqlalchemy.orm import Session
+from .config import settings
 from .deps import SessionLocal  # if you expose this; otherwise create a SessionLocal in deps.py
 from . import models
-from .services.youtube import sync_channel_snapshot
+from .services import youtube, instagram
 
 _tz = pytz.timezone("Asia/Kolkata")
 scheduler = BackgroundScheduler(timezone=_tz)
 
-def _sync_all_youtube():
-    # one DB session for the whole run
+# Per-provider cap on concurrent syncs (API quotas / rate limits), shared by every
+# run in this process, so an overlapping manual run can't double the load.
+_provider_limits: dict[str, threading.BoundedSemaphore] = {}
+_limits_lock = threading.Lock()
+
+# last summary per provider, for inspection
+last_runs: dict[str, dict] = {}
+
+# provider -> sync(db, workspace_id) -> {"ok": bool, "reason": ...}. Scheduled in
+# registration order, staggered by settings.sync_stagger_minutes.
+PROVIDERS: dict[str, Callable] = {}
+
+def register_provider(provider: str, sync_fn) -> None:
+    PROVIDERS[provider] = sync_fn
+
+def _provider_limit(provider: str) -> threading.BoundedSemaphore:
+    with _limits_lock:
+        if provider not in _provider_limits:
+            limit = getattr(settings, f"{provider}_sync_concurrency", settings.sync_workers)
+            _provider_limits[provider] = threading.BoundedSemaphore(max(1, limit))
+        return _provider_limits[provider]
+
+def _workspaces_for(provider: str) -> list[str]:
     db: Session = SessionLocal()
     try:
         rows = (
             db.query(models.Integration.workspace_id)
-            .filter(models.Integration.provider == "youtube")
+            .filter(models.Integration.provider == provider)
             .distinct()
             .all()
         )
-        for (wid,) in rows:
-            try:
-                sync_channel_snapshot(db, wid)
-            except Exception as e:
-                # log and continue; don't crash the job loop
-                print(f"[jobs] youtube sync failed for {wid}: {e}")
+        return [wid for (wid,) in rows]
     finally:
         db.close()
 
+def _sync_one(provider: str, sync_fn, workspace_id: str) -> dict:
+    # one DB session per workspace/worker; a failure only rolls back this workspace
+    with _provider_limit(provider):
+        db: Session = SessionLocal()
+        t0 = time.perf_counter()
+        try:
+            res = sync_fn(db, workspace_id) or {}
+            ok = bool(res.get("ok"))
+            return {
+                "workspace_id": workspace_id,
+                "ok": ok,
+                "reason": None if ok else res.get("reason"),
+                "duration_ms": round((time.perf_counter() - t0) * 1000, 1),
+            }
+        except Exception as e:
+            db.rollback()
+            return {
+                "workspace_id": workspace_id,
+                "ok": False,
+                "reason": f"{type(e).__name__}: {(str(e).splitlines() or [''])[0]}",
+                "duration_ms": round((time.perf_counter() - t0) * 1000, 1),
+            }
+        finally:
+            db.close()
+
+def run_sync(provider: str, sync_fn, workspace_ids: list[str] | None = None, max_workers: int | None = None) -> dict:
+    """
+    Sync every workspace connected to provider on a bounded thread pool and
+    return a summary: counts, wall time, per-workspace results and durations.
+    """
+    started = datetime.now(_tz)
+    t0 = time.perf_counter()
+    if workspace_ids is None:
+        workspace_ids = _workspaces_for(provider)
+
+    workers = max(1, min(max_workers or settings.sync_workers, len(workspace_ids) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"sync-{provider}") as pool:
+        results = list(pool.map(lambda wid: _sync_one(provider, sync_fn, wid), workspace_ids))
+
+    durations = [r["duration_ms"] for r in results]
+    failed = [r for r in results if not r["ok"]]
+    summary = {
+        "provider": provider,
+        "started_at": started.isoformat(),
+        "workers": workers,
+        "total": len(results),
+        "ok": len(results) - len(failed),
+        "failed": len(failed),
+        "wall_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "p50_ms": statistics.median(durations) if durations else 0.0,
+        "max_ms": max(durations) if durations else 0.0,
+        "results": results,
+    }
+    last_runs[provider] = summary
+
+    print(
+        f"[jobs] {provider} sync: {summary['ok']}/{summary['total']} ok, {summary['failed']} failed "
+        f"in {summary['wall_ms'] / 1000:.1f}s ({workers} workers, p50 {summary['p50_ms']:.0f} ms, "
+        f"max {summary['max_ms']:.0f} ms)"
+    )
+    for r in failed:
+        # log and continue; one workspace never stops the run
+        print(f"[jobs] {provider} sync failed for {r['workspace_id']}: {r['reason']}")
+    return summary
+
+def sync_provider(provider: str, workspace_ids: list[str] | None = None) -> dict:
+    return run_sync(provider, PROVIDERS[provider], workspace_ids)
+
+def _sync_all_youtube():
+    return sync_provider("youtube")
+
+# looked up at call time so the sync functions can be swapped in scripts/benchmarks
+register_provider("youtube", lambda db, wid: youtube.sync_channel_snapshot(db, wid))
+register_provider("instagram", lambda db, wid: instagram.sync_profile_snapshot(db, wid))
+
+def schedule_times() -> dict[str, tuple[int, int]]:
+    """(hour, minute) per provider: sync_schedule_start, then every sync_stagger_minutes."""
+    h, m = (int(x) for x in settings.sync_schedule_start.split(":"))
+    start = h * 60 + m
+    out = {}
+    for i, provider in enumerate(PROVIDERS):
+        t = (start + i * settings.sync_stagger_minutes) % (24 * 60)
+        out[provider] = divmod(t, 60)
+    return out
+
 def start_scheduler():
     # Avoid duplicate jobs if reloader starts twice
     if not scheduler.get_jobs():
-        scheduler.add_job(_sync_all_youtube, "cron", hour=3, minute=5)  # 03:05 IST daily
+        for provider, (hour, minute) in schedule_times().items():
+            scheduler.add_job(
+                sync_provider, "cron", args=[provider], hour=hour, minute=minute,
+                id=f"sync-{provider}", coalesce=True, max_instances=1,
+            )
+            print(f"[jobs] {provider} sync scheduled daily at {hour:02d}:{minute:02d} IST")
     scheduler.start()
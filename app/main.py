@@ -1,4 +1,5 @@
 import os
+import time
 import importlib
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,6 +7,10 @@ import sqlalchemy as sa
 
 from .deps import engine
 from . import models
+from .migrations import ensure_schema, LATEST_VERSION
+from .config import settings
+from .http_client import start_http_client, close_http_client
+from .services.enrichment import start_enrichment, stop_enrichment
 
 app = FastAPI(title="Hachi-co API", version="0.3.0")
 
@@ -22,20 +27,6 @@ app.add_middleware(
 def health():
     return {"ok": True}
 
-def _ensure_kpi_aggregation_column() -> None:
-    """
-    If table 'kpis' exists and column 'aggregation' is missing, add it.
-    Skip if table doesn't exist (fresh DB) — create_all() will create it correctly.
-    """
-    insp = sa.inspect(engine)
-    if not insp.has_table("kpis"):
-        return
-    cols = [c["name"] for c in insp.get_columns("kpis")]
-    if "aggregation" not in cols:
-        with engine.begin() as conn:
-            conn.exec_driver_sql('ALTER TABLE kpis ADD COLUMN aggregation VARCHAR NOT NULL DEFAULT "sum";')
-        print("[migrate] Added kpis.aggregation (DEFAULT 'sum')")
-
 def _include_routers() -> None:
     # Try to mount any router modules that exist
     for modname in [
@@ -62,10 +53,33 @@ def _include_routers() -> None:
 
 @app.on_event("startup")
 def _on_startup():
-    # 1) create tables for all models
-    models.Base.metadata.create_all(bind=engine)
-    # 2) run idempotent migrations
-    _ensure_kpi_aggregation_column()
+    # schema-version check; create_all + migrations only when the DB is behind
+    t0 = time.perf_counter()
+    version, applied = ensure_schema(engine, migrate=settings.migrate_on_startup)
+    app.state.startup_ms = round((time.perf_counter() - t0) * 1000, 1)
+    path = f"migrated {len(applied)}" if applied else ("fast path" if version >= LATEST_VERSION else "behind")
+    print(f"[startup] schema check {app.state.startup_ms} ms (v{version}, {path})")
+
+@app.on_event("startup")
+async def _open_http_client():
+    # one pooled aiohttp session for outbound scraping, closed on shutdown
+    await start_http_client()
+
+@app.on_event("startup")
+async def _start_enrichment():
+    # reference metadata workers (requeues anything left pending); they scrape
+    # through the shared HTTP session, so this runs after _open_http_client
+    await start_enrichment()
+
+# Shutdown handlers run in registration order: stop the workers (cancelling any
+# in-flight scrape) before the HTTP session they use is closed.
+@app.on_event("shutdown")
+async def _stop_enrichment():
+    await stop_enrichment()
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    await close_http_client()
 
 # Include routers immediately (not in startup event)
 _include_routers()
\ No newline at end of file
@@ -0,0 +1,210 @@
+from datetime import datetime
+from typing import Callable
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+# Small versioned migration runner. Applied versions are recorded in
+# schema_migrations; when the DB is already at LATEST_VERSION startup does a
+# single SELECT and skips create_all() and all schema inspection. Every migration
+# must be idempotent (fresh DBs get the same objects from create_all()).
+# Adding a model/table/column therefore needs a new MIGRATIONS entry, otherwise
+# warm databases never run create_all() for it.
+
+schema_migrations = sa.Table(
+    "schema_migrations",
+    sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String, nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+def _kpi_aggregation_column(conn: Connection) -> None:
+    """kpis.aggregation (DEFAULT 'sum') for DBs created before the column existed."""
+    insp = sa.inspect(conn)
+    if not insp.has_table("kpis"):
+        return
+    cols = [c["name"] for c in insp.get_columns("kpis")]
+    if "aggregation" not in cols:
+        conn.exec_driver_sql("ALTER TABLE kpis ADD COLUMN aggregation VARCHAR NOT NULL DEFAULT 'sum'")
+
+def _metrics_scope_index(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_metrics_ws_kpi_date ON metrics (workspace_id, kpi_id, date)"
+    )
+
+def _references_ws_created_index(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_references_ws_created ON "references" (workspace_id, created_at)'
+    )
+
+def _backfill_metric_rollups(conn: Connection) -> None:
+    """Populate metric_monthly_rollups from existing workspace metrics."""
+    from .services.rollups import rebuild_rollups
+
+    with Session(bind=conn) as db:
+        n = rebuild_rollups(db)
+    if n:
+        print(f"[migrate] Backfilled metric_monthly_rollups ({n} rows)")
+
+def _url_metadata_table(conn: Connection) -> None:
+    from .models import UrlMetadata
+
+    UrlMetadata.__table__.create(bind=conn, checkfirst=True)
+
+def _references_enrichment_status(conn: Connection) -> None:
+    """references.enrichment_status; existing rows were scraped inline, so they are 'done'."""
+    cols = [c["name"] for c in sa.inspect(conn).get_columns("references")]
+    if "enrichment_status" not in cols:
+        conn.exec_driver_sql(
+            "ALTER TABLE \"references\" ADD COLUMN enrichment_status VARCHAR NOT NULL DEFAULT 'done'"
+        )
+
+def _references_keyset_indexes(conn: Connection) -> None:
+    """(workspace_id, [platform,] created_at, id) for keyset paging; supersedes ix_references_ws_created."""
+    conn.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_references_ws_created_id ON "references" (workspace_id, created_at, id)'
+    )
+    conn.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS ix_references_ws_platform_created_id '
+        'ON "references" (workspace_id, platform, created_at, id)'
+    )
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_references_ws_created")
+
+def _references_search_index(conn: Connection) -> None:
+    """FTS5 table (SQLite) / generated tsvector + GIN (Postgres) over references, backfilled."""
+    from .services.search import create_search_index
+
+    create_search_index(conn)
+
+def _tag_links_table(conn: Connection) -> None:
+    """tag_links inverted index, backfilled from references.tags and wins.tags."""
+    from .models import TagLink
+    from .services.tags import rebuild_tag_index
+
+    TagLink.__table__.create(bind=conn, checkfirst=True)
+    n = rebuild_tag_index(conn)
+    if n:
+        print(f"[migrate] Backfilled tag_links ({n} rows)")
+
+def _references_thumbnail_hash(conn: Connection) -> None:
+    cols = [c["name"] for c in sa.inspect(conn).get_columns("references")]
+    if "thumbnail_hash" not in cols:
+        conn.exec_driver_sql('ALTER TABLE "references" ADD COLUMN thumbnail_hash VARCHAR')
+
+def _metrics_scope_unique(conn: Connection) -> None:
+    """
+    uq_metric_scope for DBs whose metrics table predates it (create_all never adds
+    constraints to existing tables). Duplicate (kpi_id, date, workspace_id) points
+    are removed first, keeping the newest row; workspace-less rows are left alone
+    since NULLs never conflict.
+    """
+    insp = sa.inspect(conn)
+    if not insp.has_table("metrics"):
+        return
+    wanted = {"kpi_id", "date", "workspace_id"}
+    if any(set(u["column_names"]) == wanted for u in insp.get_unique_constraints("metrics")) or any(
+        i.get("unique") and set(i["column_names"]) == wanted for i in insp.get_indexes("metrics")
+    ):
+        return
+
+    dupes = conn.exec_driver_sql(
+        "SELECT DISTINCT workspace_id FROM metrics WHERE workspace_id IS NOT NULL "
+        "GROUP BY kpi_id, date, workspace_id HAVING count(*) > 1"
+    ).scalars().all()
+    if dupes:
+        n = conn.exec_driver_sql(
+            "DELETE FROM metrics WHERE workspace_id IS NOT NULL AND id NOT IN ("
+            "SELECT max(id) FROM metrics WHERE workspace_id IS NOT NULL GROUP BY kpi_id, date, workspace_id)"
+        ).rowcount
+        print(f"[migrate] Removed {n} duplicate metric rows in {len(dupes)} workspace(s)")
+    conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS uq_metric_scope ON metrics (kpi_id, date, workspace_id)")
+
+    if dupes:
+        from .services.rollups import rebuild_rollups
+
+        with Session(bind=conn) as db:
+            for ws in dupes:
+                rebuild_rollups(db, ws)
+
+def _references_enrichment_claim(conn: Connection) -> None:
+    cols = [c["name"] for c in sa.inspect(conn).get_columns("references")]
+    if "enrichment_claimed_at" not in cols:
+        conn.exec_driver_sql('ALTER TABLE "references" ADD COLUMN enrichment_claimed_at TIMESTAMP')
+
+def _references_thumbnail_failed(conn: Connection) -> None:
+    cols = [c["name"] for c in sa.inspect(conn).get_columns("references")]
+    if "thumbnail_failed_at" not in cols:
+        conn.exec_driver_sql('ALTER TABLE "references" ADD COLUMN thumbnail_failed_at TIMESTAMP')
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "kpis.aggregation column", _kpi_aggregation_column),
+    (2, "metrics (workspace_id, kpi_id, date) index", _metrics_scope_index),
+    (3, "references (workspace_id, created_at) index", _references_ws_created_index),
+    (4, "backfill metric_monthly_rollups", _backfill_metric_rollups),
+    (5, "url_metadata cache table", _url_metadata_table),
+    (6, "references.enrichment_status column", _references_enrichment_status),
+    (7, "references keyset (created_at, id) indexes", _references_keyset_indexes),
+    (8, "references full-text search index", _references_search_index),
+    (9, "tag_links tag index", _tag_links_table),
+    (10, "references.thumbnail_hash column", _references_thumbnail_hash),
+    (11, "metrics uq_metric_scope unique index", _metrics_scope_unique),
+    (12, "references.enrichment_claimed_at column", _references_enrichment_claim),
+    (13, "references.thumbnail_failed_at column", _references_thumbnail_failed),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn: Connection) -> int:
+    try:
+        return conn.execute(sa.select(sa.func.max(schema_migrations.c.version))).scalar() or 0
+    except sa.exc.DBAPIError:
+        conn.rollback()
+        return 0
+
+def run_migrations(engine: Engine) -> list[int]:
+    """Apply pending migrations in order, one transaction each. Returns applied versions."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return []
+
+    schema_migrations.create(bind=engine, checkfirst=True)
+    applied = []
+    for v, name, fn in MIGRATIONS:
+        if v <= version:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(version=v, name=name, applied_at=datetime.utcnow()))
+        applied.append(v)
+        print(f"[migrate] {v:03d} {name}")
+    return applied
+
+def ensure_schema(engine: Engine, migrate: bool = True) -> tuple[int, list[int]]:
+    """
+    Startup schema check. Fast path: one SELECT on schema_migrations when current.
+    Otherwise (and only if migrate=True) create missing tables and apply pending
+    migrations. Returns (version_before, applied_versions).
+    """
+    from . import models
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return version, []
+    if not migrate:
+        print(f"[migrate] schema at v{version}, expected v{LATEST_VERSION}; run `python -m app.migrations`")
+        return version, []
+
+    models.Base.metadata.create_all(bind=engine)
+    return version, run_migrations(engine)
+
+if __name__ == "__main__":
+    # one-shot: python -m app.migrations (e.g. before a rolling restart with MIGRATE_ON_STARTUP=false)
+    from .deps import engine
+
+    before, applied = ensure_schema(engine)
+    if applied:
+        print(f"[migrate] v{before} -> v{applied[-1]}")
+    else:
+        print(f"[migrate] schema is current (v{before})")
@@ -54,8 +54,26 @@ class Metric(Base):
     __table_args__ = (
         # prevent duplicate daily points per scope; workspace_id can be NULL
         sa.UniqueConstraint("kpi_id", "date", "workspace_id", name="uq_metric_scope"),
+        # covers the hot (workspace, kpi, date range) filters
+        sa.Index("ix_metrics_ws_kpi_date", "workspace_id", "kpi_id", "date"),
     )       # "manual" | "csv" | "api"
 
+class MetricMonthlyRollup(Base):
+    __tablename__ = "metric_monthly_rollups"
+    workspace_id = Column(String, nullable=False)
+    kpi_id = Column(String, ForeignKey("kpis.id"), nullable=False)
+    period = Column(String, nullable=False)            # "YYYY-MM"
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_count = Column(Integer, nullable=False, default=0)
+    last_value = Column(Float, nullable=True)          # value on last_date (latest point in month)
+    last_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("workspace_id", "kpi_id", "period"),
+        Index("ix_metric_rollups_ws_period", "workspace_id", "period"),
+    )
+
 
 
 
@@ -129,6 +147,32 @@ class Integration(Base):
         Index("ix_integrations_ws_provider", "workspace_id", "provider"),
     )
 
+class TagLink(Base):
+    # inverted tag index for references and wins (see services.tags)
+    __tablename__ = "tag_links"
+    entity = Column(String, nullable=False)            # "reference" | "win"
+    entity_id = Column(String, nullable=False)
+    tag = Column(String, nullable=False)               # normalized (lowercase)
+    workspace_id = Column(String, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("entity", "entity_id", "tag"),
+        # tag filters and facet counts: covering for (ws, entity, tag) -> entity_id
+        Index("ix_tag_links_ws_entity_tag", "workspace_id", "entity", "tag", "entity_id"),
+    )
+
+class UrlMetadata(Base):
+    # scrape cache shared across workspaces (see services.url_cache)
+    __tablename__ = "url_metadata"
+    url_key = Column(String, primary_key=True)         # sha1 of the normalized URL
+    url = Column(Text, nullable=False)                 # normalized URL
+    title = Column(Text, nullable=True)
+    thumbnail = Column(Text, nullable=True)
+    platform = Column(String, nullable=True)
+    ok = Column(Boolean, nullable=False, default=True) # False = negative entry (scrape failed)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
 class Reference(Base):
     __tablename__ = "references"
 
@@ -140,11 +184,21 @@ class Reference(Base):
     title = Column(Text)
     description = Column(Text)
     thumbnail = Column(Text)
+    thumbnail_hash = Column(String, nullable=True)  # sha256 in the local thumbnail store
+    thumbnail_failed_at = Column(DateTime, nullable=True)  # thumbnail URL didn't serve a usable image
     platform = Column(String, index=True)
     tags = Column(JSON, default=list)
+    enrichment_status = Column(String, nullable=False, default="done", server_default="done")  # "pending" | "done" | "failed"
+    enrichment_claimed_at = Column(DateTime, nullable=True)  # lease of the process enriching the row
     
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     workspace = relationship("Workspace", back_populates="references")
+
+    __table_args__ = (
+        # keyset listing: newest first per workspace, optionally per platform
+        Index("ix_references_ws_created_id", "workspace_id", "created_at", "id"),
+        Index("ix_references_ws_platform_created_id", "workspace_id", "platform", "created_at", "id"),
+    )
     
\ No newline at end of file
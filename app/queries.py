@@ -0,0 +1,84 @@
+from sqlalchemy import select, func, bindparam
+from . import models
+
+# Hot statements built once at import time with bound-parameter placeholders.
+# Reusing the same statement objects lets SQLAlchemy's compiled cache skip
+# re-compiling SQL on every request, and the Metric/Goal column mapping below is
+# resolved once instead of per request.
+
+def _pick(model, *names):
+    for n in names:
+        if hasattr(model, n):
+            return getattr(model, n)
+    return None
+
+M, G, K, R = models.Metric, models.Goal, models.KPI, models.MetricMonthlyRollup
+I, WK = models.Integration, models.WorkspaceKPI
+
+# ---------- resolved column mapping ----------
+
+METRIC_WS = _pick(M, "workspace_id", "workspace", "workspaceId", "ws_id")
+METRIC_KPI = _pick(M, "kpi_id", "kpi", "kpiId")
+METRIC_DATE = _pick(M, "date", "dt", "day")
+METRIC_VALUE = _pick(M, "value", "val", "amount", "number")
+METRIC_SOURCE = _pick(M, "source")
+
+GOAL_KPI = _pick(G, "kpi_id", "kpi", "kpiId")
+GOAL_PERIOD = _pick(G, "period", "month", "mm")
+GOAL_TARGET = _pick(G, "target", "goal", "target_value")
+
+# ---------- integrations / status ----------
+
+INTEGRATION = (
+    select(I)
+    .where(I.workspace_id == bindparam("workspace_id"), I.provider == bindparam("provider"))
+    .limit(1)
+)
+
+def _last_metric_date_stmt():
+    stmt = select(func.max(METRIC_DATE))
+    if METRIC_SOURCE is not None:
+        stmt = stmt.where(METRIC_SOURCE.like(bindparam("source_like")))
+    if METRIC_WS is not None:
+        stmt = stmt.where(METRIC_WS == bindparam("workspace_id"))
+    return stmt
+
+LAST_METRIC_DATE = _last_metric_date_stmt() if METRIC_DATE is not None else None
+
+def integration(db, workspace_id: str, provider: str):
+    return db.execute(INTEGRATION, {"workspace_id": workspace_id, "provider": provider}).scalars().first()
+
+def last_metric_date(db, workspace_id: str, provider: str):
+    """Latest metric date written by a provider sync ("<provider>:..." sources)."""
+    if LAST_METRIC_DATE is None:
+        return None
+    return db.execute(LAST_METRIC_DATE, {"workspace_id": workspace_id, "source_like": f"{provider}:%"}).scalar()
+
+# ---------- reports / progress ----------
+
+ATTACHED_KPI_IDS = select(WK.kpi_id).where(WK.workspace_id == bindparam("workspace_id"))
+ALL_KPI_IDS = select(K.id)
+
+def _kpi_progress_stmt():
+    """KPI LEFT JOIN monthly rollups LEFT JOIN grouped goal targets, for one period."""
+    kpi_ids = bindparam("kpi_ids", expanding=True)
+    agg = (
+        select(R.kpi_id.label("kpi_id"), R.value_sum.label("total"), R.last_value.label("last"))
+        .where(R.workspace_id == bindparam("workspace_id"), R.period == bindparam("period"), R.kpi_id.in_(kpi_ids))
+        .subquery("agg")
+    )
+    goal = (
+        select(GOAL_KPI.label("kpi_id"), func.max(GOAL_TARGET).label("target"))
+        .where(GOAL_KPI.in_(kpi_ids), GOAL_PERIOD == bindparam("period"))
+        .group_by(GOAL_KPI)
+        .subquery("goal")
+    )
+    return (
+        select(K, agg.c.total, agg.c.last, goal.c.target)
+        .outerjoin(agg, agg.c.kpi_id == K.id)
+        .outerjoin(goal, goal.c.kpi_id == K.id)
+        .where(K.id.in_(kpi_ids))
+        .order_by(K.id)
+    )
+
+KPI_PROGRESS = _kpi_progress_stmt()
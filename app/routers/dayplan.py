@@ -5,7 +5,7 @@ from sqlalchemy import and_
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from ..deps import get_db, require_api_key
+from ..deps import get_db, get_read_db, require_api_key
 from .. import models
 
 TZ = ZoneInfo("Asia/Kolkata")
@@ -77,7 +77,7 @@ def get_today(workspace_id: str, db: Session = Depends(get_db)):
     }
 
 @router.get("/{workspace_id}/{date}/tasks")
-def list_day(workspace_id: str, date: str, db: Session = Depends(get_db)):
+def list_day(workspace_id: str, date: str, db: Session = Depends(get_read_db)):
     tasks = db.query(models.DayTask).filter(
         and_(models.DayTask.workspace_id == workspace_id, models.DayTask.date == date)
     ).order_by(models.DayTask.created_at.asc()).all()
@@ -113,12 +113,13 @@ def delete_task(workspace_id: str, date: str, task_id: str, db: Session = Depend
     return {"ok": True}
 
 @router.get("/{workspace_id}/month/{period}")
-def month_group(workspace_id: str, period: str, db: Session = Depends(get_db)):
+def month_group(workspace_id: str, period: str, db: Session = Depends(get_read_db)):
     # period: "YYYY-MM"; return days for that month grouped newest-first
-    like = f"{period}-%"
+    # string range instead of LIKE so ix_day_tasks_ws_date can be used
     rows = db.query(models.DayTask).filter(
         and_(models.DayTask.workspace_id == workspace_id,
-             models.DayTask.date.like(like))
+             models.DayTask.date >= f"{period}-01",
+             models.DayTask.date <= f"{period}-31")
     ).order_by(models.DayTask.date.desc(), models.DayTask.created_at.asc()).all()
 
     grouped = {}
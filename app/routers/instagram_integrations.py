@@ -3,61 +3,24 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date, datetime, timezone
 import requests
 import traceback
 
 from ..deps import get_db, require_api_key
-from .. import models
+from .. import models, queries
+from ..services import instagram
 
 router = APIRouter(prefix="/integrations/instagram", tags=["integrations"], dependencies=[Depends(require_api_key)])
 
-def _pick(model, *names):
-    """Helper to find column name across different model schemas (from YouTube integration)"""
-    for n in names:
-        if hasattr(model, n):
-            return getattr(model, n)
-    return None
-
-def _attr_name(attr):
-    """Get attribute name for dynamic column setting (from YouTube integration)"""
-    return getattr(attr, "key", None) or getattr(attr, "name", None) or str(attr).split(".")[-1]
-
-def ensure_kpi(db: Session, kpi_id: str, name: str, channel: str, unit: str, aggregation: str = "last"):
-    """Create KPI if it doesn't exist (following YouTube pattern)"""
-    kpi = db.query(models.KPI).filter(models.KPI.id == kpi_id).first()
-    if not kpi:
-        kpi = models.KPI(id=kpi_id, name=name, channel=channel, unit=unit, aggregation=aggregation)
-        db.add(kpi)
-        db.commit()
-
 @router.get("/status")
 def status(workspace_id: str, db: Session = Depends(get_db)):
     """Get Instagram integration status for a workspace (following YouTube pattern)"""
     
-    integ = (
-        db.query(models.Integration)
-        .filter(models.Integration.provider == "instagram")
-        .filter(models.Integration.workspace_id == workspace_id)
-        .first()
-    )
+    integ = queries.integration(db, workspace_id, "instagram")
     connected = bool(integ)
 
-    # Check last sync date using the same pattern as YouTube
-    M = models.Metric
-    m_ws = _pick(M, "workspace_id", "workspace", "workspaceId", "ws_id")
-    m_src = _pick(M, "source")
-    m_date = _pick(M, "date", "dt", "day")
-
-    last_metric_date = None
-    if m_date is not None:
-        q = db.query(func.max(m_date))
-        if m_src is not None:
-            q = q.filter(m_src.like("instagram:%"))
-        if m_ws is not None:
-            q = q.filter(m_ws == workspace_id)
-        last_metric_date = q.scalar()
+    # Check last sync date using the same prebuilt query as YouTube
+    last_metric_date = queries.last_metric_date(db, workspace_id, "instagram")
 
     # Get Instagram username if connected
     instagram_username = None
@@ -89,116 +52,27 @@ def sync_profile(workspace_id: str, db: Session = Depends(get_db)):
     """Sync Instagram profile metrics to KPIs (following YouTube pattern)"""
     
     try:
-        # Get OAuth connection
-        integ = (
-            db.query(models.Integration)
-            .filter(models.Integration.provider == "instagram")
-            .filter(models.Integration.workspace_id == workspace_id)
-            .first()
-        )
-        if not integ:
+        res = instagram.sync_profile_snapshot(db, workspace_id)
+        if res.get("reason") == "not_connected":
             raise HTTPException(400, "Instagram is not connected for this workspace")
 
-        access_token = integ.access_token
-        instagram_account_id = integ.external_account_id
-        
-        # Get Instagram profile data
-        profile_response = requests.get(
-            f"https://graph.instagram.com/v18.0/{instagram_account_id}",
-            params={
-                "fields": "followers_count,follows_count,media_count,username,account_type",
-                "access_token": access_token
-            }
-        )
-        profile_response.raise_for_status()
-        profile_data = profile_response.json()
-        
-        # Get recent media for engagement calculation
-        media_response = requests.get(
-            f"https://graph.instagram.com/v18.0/{instagram_account_id}/media",
-            params={
-                "fields": "id,like_count,comments_count,timestamp",
-                "limit": 12,  # Last 12 posts for engagement average
-                "access_token": access_token
-            }
-        )
-        media_response.raise_for_status()
-        media_data = media_response.json()
-        
-        # Extract values
-        followers_count = float(profile_data.get("followers_count", 0))
-        following_count = float(profile_data.get("follows_count", 0))
-        media_count = float(profile_data.get("media_count", 0))
-        
-        # Calculate average engagement from recent posts
-        recent_posts = media_data.get("data", [])
-        total_engagement = 0
-        engagement_count = 0
-        
-        for post in recent_posts:
-            likes = post.get("like_count", 0) or 0
-            comments = post.get("comments_count", 0) or 0
-            total_engagement += likes + comments
-            engagement_count += 1
-        
-        avg_engagement = float(total_engagement / engagement_count) if engagement_count > 0 else 0.0
-        engagement_rate = float((avg_engagement / followers_count) * 100) if followers_count > 0 else 0.0
-
-        # Ensure KPIs exist (following YouTube pattern)
-        ensure_kpi(db, "k_ig_followers", "Followers", "Instagram", "count", aggregation="last")
-        ensure_kpi(db, "k_ig_following", "Following", "Instagram", "count", aggregation="last") 
-        ensure_kpi(db, "k_ig_posts", "Posts", "Instagram", "count", aggregation="last")
-        ensure_kpi(db, "k_ig_avg_engagement", "Avg Engagement", "Instagram", "count", aggregation="last")
-        ensure_kpi(db, "k_ig_engagement_rate", "Engagement Rate", "Instagram", "percent", aggregation="last")
-
-        # Clear old metrics for today (following YouTube pattern)
-        M = models.Metric
-        dcol = _pick(M, "date", "dt", "day")
-        wscol = _pick(M, "workspace_id", "workspace", "workspaceId", "ws_id")
-        today = date.today()
-
-        # Delete existing metrics for these KPIs today
-        kpi_ids = ["k_ig_followers", "k_ig_following", "k_ig_posts", "k_ig_avg_engagement", "k_ig_engagement_rate"]
-        delete_q = db.query(M).filter(M.kpi_id.in_(kpi_ids))
-        if dcol is not None:
-            delete_q = delete_q.filter(dcol == today)
-        if wscol is not None:
-            delete_q = delete_q.filter(wscol == workspace_id)
-        delete_q.delete()
-
-        # Insert fresh metrics (following YouTube pattern)
-        def insert_metric(kpi_id: str, value: float):
-            m = M(kpi_id=kpi_id, value=value, source="instagram:profile")
-            if dcol is not None:
-                setattr(m, _attr_name(dcol), today)
-            if wscol is not None:
-                setattr(m, _attr_name(wscol), workspace_id)
-            db.add(m)
-
-        insert_metric("k_ig_followers", followers_count)
-        insert_metric("k_ig_following", following_count)
-        insert_metric("k_ig_posts", media_count)
-        insert_metric("k_ig_avg_engagement", avg_engagement)
-        insert_metric("k_ig_engagement_rate", engagement_rate)
-        
-        db.commit()
-
+        profile_data, values = res["profile"], res["values"]
         print(f"Instagram sync completed for account: {profile_data.get('username')}")
-        print(f"Fresh metrics: followers={followers_count}, following={following_count}, posts={media_count}")
-        print(f"Engagement: avg={avg_engagement:.1f}, rate={engagement_rate:.2f}%")
-        
+        print(f"Fresh metrics: followers={values['k_ig_followers']}, following={values['k_ig_following']}, posts={values['k_ig_posts']}")
+        print(f"Engagement: avg={values['k_ig_avg_engagement']:.1f}, rate={values['k_ig_engagement_rate']:.2f}%")
+
         return {
             "ok": True, 
-            "date": today.isoformat(), 
-            "updated": ["k_ig_followers", "k_ig_following", "k_ig_posts", "k_ig_avg_engagement", "k_ig_engagement_rate"],
+            "date": res["date"], 
+            "updated": res["updated"],
             "profile_data": {
                 "username": profile_data.get("username"),
                 "account_type": profile_data.get("account_type"),
-                "followers": int(followers_count),
-                "following": int(following_count),
-                "posts": int(media_count),
-                "avg_engagement": round(avg_engagement, 1),
-                "engagement_rate": round(engagement_rate, 2)
+                "followers": int(values["k_ig_followers"]),
+                "following": int(values["k_ig_following"]),
+                "posts": int(values["k_ig_posts"]),
+                "avg_engagement": round(values["k_ig_avg_engagement"], 1),
+                "engagement_rate": round(values["k_ig_engagement_rate"], 2)
             }
         }
 
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from ..deps import get_db, require_api_key
-from .. import models
+from .. import models, queries
 from ..services.youtube import sync_channel_snapshot
 
 router = APIRouter(
@@ -11,37 +11,13 @@ router = APIRouter(
     dependencies=[Depends(require_api_key)],
 )
 
-def _pick(model, *names):
-    for n in names:
-        if hasattr(model, n):
-            return getattr(model, n)
-    return None
-
 @router.get("/status")
 def yt_status(workspace_id: str, db: Session = Depends(get_db)):
-    integ = (
-        db.query(models.Integration)
-        .filter(models.Integration.provider == "youtube")
-        .filter(models.Integration.workspace_id == workspace_id if hasattr(models.Integration, "workspace_id") else True)
-        .first()
-    )
+    integ = queries.integration(db, workspace_id, "youtube")
     connected = bool(integ)
 
-    # last metric date (workspace filter only if column exists)
-    M = models.Metric
-    m_ws   = _pick(M, "workspace_id", "workspace", "workspaceId", "ws_id")
-    m_src  = _pick(M, "source")
-    m_date = _pick(M, "date", "dt", "day")
-
-    q = db.query(func.max(m_date)) if m_date is not None else None
-    if q is not None:
-        if m_src is not None:
-            q = q.filter(m_src.like("youtube:%"))
-        if m_ws is not None:
-            q = q.filter(m_ws == workspace_id)
-        last_metric_date = q.scalar()
-    else:
-        last_metric_date = None
+    # last metric date (prebuilt; workspace filter only if column exists)
+    last_metric_date = queries.last_metric_date(db, workspace_id, "youtube")
 
     return {
         "connected": connected,
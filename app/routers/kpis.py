@@ -53,6 +53,7 @@ def delete_kpi(
     # Cascade delete (metrics, goals, attachments), then KPI itself
     if force:
         db.query(models.Metric).filter(models.Metric.kpi_id == kpi_id).delete(synchronize_session=False)
+        db.query(models.MetricMonthlyRollup).filter(models.MetricMonthlyRollup.kpi_id == kpi_id).delete(synchronize_session=False)
         db.query(models.Goal).filter(models.Goal.kpi_id == kpi_id).delete(synchronize_session=False)
         db.query(models.WorkspaceKPI).filter(models.WorkspaceKPI.kpi_id == kpi_id).delete(synchronize_session=False)
 
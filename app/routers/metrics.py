@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
 from uuid import uuid4
 from datetime import date
-from ..deps import get_db, require_api_key
+from ..deps import get_db, get_read_db, require_api_key
 from .. import models, schemas
+from ..services.rollups import touch_metrics
+from ..services.progress import kpi_progress
+from ..services.periods import period_bounds
+from ..services.metric_import import BATCH_SIZE, import_metrics_csv, open_text, read_csv
+from ..services.metric_export import export_stmt, iter_csv, iter_ndjson
+from fastapi.responses import StreamingResponse
 from fastapi import UploadFile, File, HTTPException
 import csv, io
 from datetime import datetime
@@ -14,123 +21,110 @@ router = APIRouter(prefix="/metrics", tags=["metrics"])
 
 @router.post("", dependencies=[Depends(require_api_key)])
 def add_metric(payload: schemas.MetricCreate, db: Session = Depends(get_db)):
-    m = models.Metric(id=str(uuid4()), **payload.model_dump())
-    db.add(m); db.commit()
+    m = models.Metric(**payload.model_dump())
+    db.add(m)
+    touch_metrics(db, [(m.workspace_id, m.kpi_id, m.date)])
+    db.commit()
     return {"ok": True, "metric_id": m.id}
 
+def _check_period(period: str) -> None:
+    try:
+        period_bounds(period)
+    except Exception:
+        raise HTTPException(400, "Invalid period, expected YYYY-MM")
+
 @router.get("/progress/{kpi_id}/{period}", dependencies=[Depends(require_api_key)])
-def progress(kpi_id: str, period: str, db: Session = Depends(get_db)):
+def progress(kpi_id: str, period: str, workspace_id: str = Query(...), db: Session = Depends(get_read_db)):
     # period "YYYY-MM"
-    year, month = map(int, period.split("-"))
-    month_start = date(year, month, 1)
-    month_end = date(year + (month // 12), 1 if month == 12 else month + 1, 1)
-
-    actual = db.query(func.coalesce(func.sum(models.Metric.value), 0.0))\
-    .filter(models.Metric.kpi_id == kpi_id,
-            models.Metric.workspace_id == workspace_id,
-            models.Metric.date >= month_start,
-            models.Metric.date < month_end)\
-    .scalar()
-    goal = db.query(models.Goal).filter_by(kpi_id=kpi_id, period=period).first()
-    target = goal.target_value if goal else 0.0
-    pct = (actual / target * 100.0) if target > 0 else None
-    return {"kpi_id": kpi_id, "period": period, "actual": actual, "target": target, "pct_of_target": pct}
+    _check_period(period)
+    p = kpi_progress(db, workspace_id, period, [kpi_id]).get(kpi_id)
+    if not p:
+        raise HTTPException(404, "KPI not found")
+    return {"kpi_id": kpi_id, "period": period, "actual": p["actual"], "target": p["target"], "pct_of_target": p["pct_of_target"]}
 
 
 @router.get("/progress/workspace/{workspace_id}/{period}", dependencies=[Depends(require_api_key)])
-def progress_workspace(workspace_id: str, period: str, db: Session = Depends(get_db)):
+def progress_workspace(workspace_id: str, period: str, db: Session = Depends(get_read_db)):
+    _check_period(period)
+
     # Gather all KPI ids attached to this workspace
     kpi_links = db.query(models.WorkspaceKPI).filter_by(workspace_id=workspace_id).all()
     kpi_ids = [ln.kpi_id for ln in kpi_links]
     if not kpi_ids:
         return {"workspace_id": workspace_id, "period": period, "cards": []}
 
-    # Period boundaries
-    from datetime import date
-    from sqlalchemy import func
-    year, month = map(int, period.split("-"))
-    month_start = date(year, month, 1)
-    month_end = date(year + (month // 12), 1 if month == 12 else month + 1, 1)
+    # One batched query for every KPI's actual + target
+    progress_by_kpi = kpi_progress(db, workspace_id, period, kpi_ids)
 
-    # Query all KPIs metadata
-    kpi_rows = db.query(models.KPI).filter(models.KPI.id.in_(kpi_ids)).all()
-    kpi_index = {k.id: k for k in kpi_rows}
-
-    # For each KPI, compute actual, target
     cards = []
     for kpi_id in kpi_ids:
-        actual = db.query(func.coalesce(func.sum(models.Metric.value), 0.0))\
-        .filter(models.Metric.kpi_id == kpi_id,
-                models.Metric.workspace_id == workspace_id,
-                models.Metric.date >= month_start,
-                models.Metric.date < month_end)\
-        .scalar()
-        goal = db.query(models.Goal).filter_by(kpi_id=kpi_id, period=period).first()
-        target = goal.target_value if goal else 0.0
-        pct = (actual / target * 100.0) if target > 0 else None
-        k = kpi_index.get(kpi_id)
+        p = progress_by_kpi.get(kpi_id)
+        k = p["kpi"] if p else None
         cards.append({
             "kpi_id": kpi_id,
             "name": k.name if k else kpi_id,
             "channel": k.channel if k else None,
             "unit": k.unit if k else None,
-            "actual": actual,
-            "target": target,
-            "pct_of_target": pct,
-    })
+            "actual": p["actual"] if p else 0.0,
+            "target": p["target"] if p else 0.0,
+            "pct_of_target": p["pct_of_target"] if p else None,
+        })
 
     return {"workspace_id": workspace_id, "period": period, "cards": cards}
 
 
 @router.post("/import", dependencies=[Depends(require_api_key)])
-async def import_metrics(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def import_metrics(
+    file: UploadFile = File(...),
+    workspace_id: str | None = Query(None, description="Scope for rows without a workspace_id column"),
+    batch_size: int = Query(BATCH_SIZE, ge=100, le=50000),
+    db: Session = Depends(get_db),
+):
     # 1) basic checks
     if not (file.filename.lower().endswith(".csv")):
         raise HTTPException(400, "Please upload a .csv file")
 
-    raw = await file.read()
+    # 2) stream the upload (sync handler -> runs in the threadpool, file stays on disk)
     try:
-        text = raw.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        text = raw.decode("latin-1")
-
-    reader = csv.DictReader(io.StringIO(text))
-    required = {"kpi_id", "date", "value"}
-    if not reader.fieldnames or not required.issubset(set(h.strip() for h in reader.fieldnames)):
-        raise HTTPException(400, f"CSV must include headers: {sorted(required)}")
-
-    inserted = updated = skipped = 0
-    errors: list[str] = []
-
-    # 2) upsert by (kpi_id, date)
-    for i, row in enumerate(reader, start=2):  # header is line 1
-        try:
-            kpi_id = (row.get("kpi_id") or "").strip()
-            if not kpi_id:
-                skipped += 1
-                continue
-            d = datetime.strptime((row.get("date") or "").strip(), "%Y-%m-%d").date()
-            v = float(row.get("value"))
-            src = (row.get("source") or "csv").strip() or "csv"
-        except Exception as e:
-            errors.append(f"row {i}: {e}")
-            skipped += 1
-            continue
-
-        m = db.query(models.Metric).filter_by(kpi_id=kpi_id, date=d).first()
-        if m:
-            m.value = v
-            m.source = src
-            updated += 1
-        else:
-            db.add(models.Metric(
-                id=str(uuid4()),
-                kpi_id=kpi_id,
-                date=d,
-                value=v,
-                source=src
-            ))
-            inserted += 1
+        reader = read_csv(open_text(file.file))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    def log_progress(p: dict):
+        print(f"[import] {file.filename}: batch {p['batch']} rows={p['rows']} inserted={p['inserted']} updated={p['updated']} skipped={p['skipped']}")
 
+    # 3) batched upsert on uq_metric_scope, one commit for the whole file
+    try:
+        result = import_metrics_csv(db, reader, workspace_id=workspace_id, batch_size=batch_size, on_progress=log_progress)
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"[import] {file.filename}: failed: {e}")
+        raise HTTPException(500, f"Import failed, nothing was written: {getattr(e, 'orig', None) or e}")
+    except Exception:
+        db.rollback()
+        raise
     db.commit()
-    return {"ok": True, "inserted": inserted, "updated": updated, "skipped": skipped, "errors_preview": errors[:5]}
\ No newline at end of file
+    return {"ok": True, **result}
+
+
+@router.get("/export", dependencies=[Depends(require_api_key)])
+def export_metrics(
+    workspace_id: str = Query(...),
+    kpi_id: list[str] | None = Query(None, description="Repeat or comma-separate to select KPIs (default: all)"),
+    start: date | None = Query(None, description="YYYY-MM-DD (inclusive)"),
+    end: date | None = Query(None, description="YYYY-MM-DD (inclusive)"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+):
+    # streamed straight from a DB cursor; the generator opens its own session
+    kpi_ids = [k.strip() for v in (kpi_id or []) for k in v.split(",") if k.strip()]
+    stmt = export_stmt(workspace_id, kpi_ids, start, end)
+    filename = f"metrics_{workspace_id}.{format}"
+    if format == "ndjson":
+        body, media_type = iter_ndjson(stmt), "application/x-ndjson"
+    else:
+        body, media_type = iter_csv(stmt), "text/csv"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
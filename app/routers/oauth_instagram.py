@@ -2,13 +2,15 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import requests
 import secrets
 from urllib.parse import urlencode
 from datetime import datetime, timezone, timedelta
 
-from ..deps import get_db, settings
+from ..deps import get_async_db, settings
 from .. import models
 
 router = APIRouter(prefix="/oauth/instagram", tags=["oauth"])
@@ -17,7 +19,7 @@ router = APIRouter(prefix="/oauth/instagram", tags=["oauth"])
 oauth_states = {}
 
 @router.get("/start")
-async def start_instagram_oauth(workspace_id: str = "w_001", db: Session = Depends(get_db)):
+async def start_instagram_oauth(workspace_id: str = "w_001", db: AsyncSession = Depends(get_async_db)):
     """Initiate Instagram OAuth flow using Instagram Login"""
     
     # Generate state parameter for security
@@ -42,7 +44,7 @@ async def instagram_oauth_callback(
     code: str = None,
     state: str = None,
     error: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Handle Instagram OAuth callback and store credentials"""
     
@@ -70,7 +72,9 @@ async def instagram_oauth_callback(
         }
         
         # Instagram token exchange endpoint
-        token_response = requests.post(
+        # blocking HTTP client -> threadpool so the event loop stays free
+        token_response = await run_in_threadpool(
+            requests.post,
             "https://api.instagram.com/oauth/access_token",
             data=token_data
         )
@@ -87,7 +91,8 @@ async def instagram_oauth_callback(
             "access_token": short_lived_token
         }
         
-        long_lived_response = requests.get(
+        long_lived_response = await run_in_threadpool(
+            requests.get,
             "https://graph.instagram.com/access_token",
             params=long_lived_params
         )
@@ -98,7 +103,8 @@ async def instagram_oauth_callback(
         expires_in = long_lived_token_info.get("expires_in", 5184000)  # Default 60 days
         
         # Get Instagram account info to verify connection
-        user_info_response = requests.get(
+        user_info_response = await run_in_threadpool(
+            requests.get,
             f"https://graph.instagram.com/me",
             params={
                 "fields": "id,username,account_type",
@@ -109,10 +115,10 @@ async def instagram_oauth_callback(
         user_info = user_info_response.json()
         
         # Store or update integration in database (following YouTube pattern)
-        existing_integration = db.query(models.Integration).filter(
+        existing_integration = (await db.execute(select(models.Integration).where(
             models.Integration.provider == "instagram",
             models.Integration.workspace_id == workspace_id
-        ).first()
+        ))).scalars().first()
         
         expiry_date = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
         
@@ -135,7 +141,7 @@ async def instagram_oauth_callback(
             db.add(integration)
             print(f"Created new Instagram integration for workspace {workspace_id}")
         
-        db.commit()
+        await db.commit()
         
         # Redirect back to frontend
         frontend_url = getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')
@@ -151,7 +157,7 @@ async def instagram_oauth_callback(
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 @router.get("/deauthorize")
-async def instagram_deauthorize(db: Session = Depends(get_db)):
+async def instagram_deauthorize(db: AsyncSession = Depends(get_async_db)):
     """Handle Instagram app deauthorization (required by Meta)"""
     # This endpoint is called when users revoke access to your app
     # Log the deauthorization and clean up data as needed
@@ -159,7 +165,7 @@ async def instagram_deauthorize(db: Session = Depends(get_db)):
     return {"status": "ok"}
 
 @router.post("/delete-data")
-async def instagram_delete_data(request: Request, db: Session = Depends(get_db)):
+async def instagram_delete_data(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Handle Instagram data deletion requests (GDPR compliance)"""
     # This endpoint is called when users request data deletion
     # Implement actual data deletion logic here
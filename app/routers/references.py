@@ -1,18 +1,24 @@
 # hachico/app/routers/references.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select, String, literal, tuple_, type_coerce
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from uuid import uuid4
-import aiohttp
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
-import re
+from urllib.parse import urlparse
+from datetime import datetime
+import asyncio
+import base64
+import json
 from sqlalchemy import and_, or_
 
-from ..deps import get_db
+from ..config import settings
+from ..deps import get_async_db, get_async_read_db, AsyncSessionLocal
 from ..models import Reference
+from ..services import enrichment, scraper, search, thumbnails, url_cache
+from ..services import tags as tag_index
+from ..services.scraper import detect_platform
 
 router = APIRouter(prefix="/references", tags=["references"])
 
@@ -22,6 +28,12 @@ class ReferenceCreate(BaseModel):
     note: str = None
 
 
+class ReferenceBulkCreate(BaseModel):
+    urls: List[str] = None   # either a list of URLs...
+    text: str = None         # ...or pasted text, one URL per line
+    note: str = None
+
+
 class ReferenceUpdate(BaseModel):
     note: str = None
     tags: List[str] = None
@@ -52,132 +64,59 @@ PREDEFINED_TAGS = [
 ]
 
 
-def detect_platform(url: str) -> str:
-    """Detect platform from URL"""
-    try:
-        domain = urlparse(url).netloc.lower()
-        
-        # Remove www. prefix
-        domain = domain.replace('www.', '')
-        
-        # Platform patterns
-        if re.search(r'youtube\.com|youtu\.be', domain):
-            return 'youtube'
-        elif re.search(r'instagram\.com', domain):
-            return 'instagram'
-        elif re.search(r'tiktok\.com', domain):
-            return 'tiktok'
-        elif re.search(r'twitter\.com|x\.com', domain):
-            return 'twitter'
-        elif re.search(r'linkedin\.com', domain):
-            return 'linkedin'
-        elif re.search(r'pinterest\.com', domain):
-            return 'pinterest'
-        elif re.search(r'facebook\.com|fb\.com', domain):
-            return 'facebook'
-        else:
-            return 'website'
-            
-    except Exception:
-        return 'unknown'
-
-
-async def scrape_metadata(url: str) -> dict:
-    """Scrape basic metadata including thumbnail and title"""
-    try:
-        timeout = aiohttp.ClientTimeout(total=10)
-        headers = {'User-Agent': 'Mozilla/5.0 (compatible; Hachico/1.0)'}
-        
-        # Create SSL context that doesn't verify certificates (for development)
-        import ssl
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers, connector=connector) as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return {"title": None, "thumbnail": None}
-                
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Extract title
-                title = None
-                og_title = soup.find('meta', property='og:title')
-                if og_title:
-                    title = og_title.get('content')
-                else:
-                    title_tag = soup.find('title')
-                    if title_tag:
-                        title = title_tag.text.strip()
-                
-                # Extract thumbnail
-                thumbnail = None
-                og_image = soup.find('meta', property='og:image')
-                if og_image:
-                    thumbnail = og_image.get('content')
-                else:
-                    twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-                    if twitter_image:
-                        thumbnail = twitter_image.get('content')
-                
-                # Make thumbnail URL absolute if it's relative
-                if thumbnail and not thumbnail.startswith('http'):
-                    thumbnail = urljoin(url, thumbnail)
-                
-                return {
-                    "title": title[:200] if title else None,  # Limit title length
-                    "thumbnail": thumbnail
-                }
-                
-    except Exception as e:
-        print(f"Scraping failed for {url}: {e}")
-        return {"title": None, "thumbnail": None}
-
-
 @router.post("/")
 async def create_reference(
     reference_data: ReferenceCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create a new reference with auto-scraped metadata"""
+    """
+    Create a reference right away; title/thumbnail are filled in by the background
+    enrichment workers (enrichment_status "pending" -> "done" | "failed").
+    """
     try:
-        # Detect platform
-        platform_detected = detect_platform(reference_data.url)
-        
-        # Scrape metadata (title and thumbnail)
-        metadata = await scrape_metadata(reference_data.url)
-        
-        # Create reference with scraped data
+        # Duplicate check first, before any network I/O
+        existing = (await db.execute(select(Reference.id).where(
+            and_(
+                Reference.workspace_id == "w_001",
+                Reference.url == reference_data.url
+            )
+        ))).scalars().first()
+
+        if existing:
+            raise HTTPException(
+                status_code=409,
+                detail=f"URL already saved! Add tags to existing reference instead."
+            )
+
+        # Already scraped by this process: use it, no queueing needed
+        cached = url_cache.peek(reference_data.url)
+
         reference = Reference(
             id=str(uuid4()),
             workspace_id="w_001",  # Hardcoded for now
             url=reference_data.url,
             note=reference_data.note,
-            platform=platform_detected,
-            title=metadata["title"],
-            thumbnail=metadata["thumbnail"]
+            platform=detect_platform(reference_data.url),
+            title=cached["title"] if cached else None,
+            thumbnail=cached["thumbnail"] if cached else None,
+            enrichment_status=("failed" if url_cache.is_negative(cached) else "done") if cached else "pending",
         )
-        existing = db.query(Reference).filter(
-            and_(
-                Reference.workspace_id == "w_001",
-                Reference.url == reference_data.url
-            )
-        ).first()
+        if reference.enrichment_status == "pending" or reference.thumbnail:
+            # leased to this process's workers (see services.enrichment)
+            reference.enrichment_claimed_at = datetime.utcnow()
 
-        if existing:
-         raise HTTPException(
-             status_code=409, 
-             detail=f"URL already saved! Add tags to existing reference instead."
-             )
-        
         db.add(reference)
-        db.commit()
-        db.refresh(reference)
-        
+        await db.flush()
+        await search.sync_references(db, [reference.id])
+        await db.commit()
+        await db.refresh(reference)
+
+        # pending: scrape; done from cache: only download the thumbnail
+        if reference.enrichment_status == "pending":
+            enrichment.enqueue(reference.id, reference.url)
+        elif reference.thumbnail:
+            enrichment.enqueue_thumbnail(reference.id, reference.thumbnail)
+
         return {
             "ok": True,
             "reference": {
@@ -187,23 +126,212 @@ async def create_reference(
                 "platform": reference.platform,
                 "title": reference.title,
                 "thumbnail": reference.thumbnail,
+                "enrichment_status": reference.enrichment_status,
                 "created_at": reference.created_at
             }
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create reference: {str(e)}")
 
 
+MAX_BULK_URLS = 500
+
+
+def _ndjson(obj: dict) -> str:
+    return json.dumps(obj, default=str) + "\n"
+
+
+def _is_http_url(url: str) -> bool:
+    parts = urlparse(url)
+    return parts.scheme in ("http", "https") and bool(parts.netloc)
+
+
+@router.post("/bulk")
+async def bulk_create_references(
+    payload: ReferenceBulkCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Save many links at once. Duplicates (in the request or already saved) are
+    resolved with one query, new links are scraped concurrently (bounded overall
+    and per host, URL cache first) and inserted in a single transaction.
+    Streams one NDJSON line per input URL (repeats included):
+      {"url", "status": "created" | "duplicate" | "invalid", ...}
+    A valid link repeated within the request is saved once; each later occurrence
+    gets {"status": "duplicate", "in_request": true}.
+    Links whose scrape failed transiently are created as "pending" and handed to
+    the enrichment workers.
+    """
+    raw = list(payload.urls or [])
+    if payload.text:
+        raw += payload.text.splitlines()
+    urls = [u.strip() for u in raw if u and u.strip()]
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(urls) > MAX_BULK_URLS:
+        raise HTTPException(status_code=400, detail=f"Too many URLs (max {MAX_BULK_URLS})")
+
+    # One query for every already-saved URL in the batch
+    saved = set((await db.execute(select(Reference.url).where(
+        and_(
+            Reference.workspace_id == "w_001",
+            Reference.url.in_(set(urls))
+        )
+    ))).scalars())
+
+    results: dict[str, dict] = {}
+    repeats: list[dict] = []
+    todo: list[str] = []
+    todo_set: set[str] = set()
+    for url in urls:
+        if url in results and results[url]["status"] == "invalid":
+            repeats.append(results[url])
+            continue
+        if url in results or url in todo_set:
+            repeats.append({"url": url, "status": "duplicate", "in_request": True})
+            continue
+        if not _is_http_url(url):
+            results[url] = {"url": url, "status": "invalid"}
+        elif url in saved:
+            results[url] = {"url": url, "status": "duplicate"}
+        else:
+            todo.append(url)
+            todo_set.add(url)
+
+    async def fetch(url: str) -> dict:
+        return await url_cache.get_or_fetch(url, scraper.fetch_metadata)
+
+    async def stream():
+        for result in results.values():
+            yield _ndjson(result)
+        for result in repeats:
+            yield _ndjson(result)
+
+        refs = []
+        now = datetime.utcnow()
+        async for url, meta, error in scraper.scrape_many(
+            todo, fetch, concurrency=settings.bulk_scrape_concurrency, per_host=settings.http_pool_per_host
+        ):
+            if error is not None:
+                status = "pending"
+            else:
+                status = "failed" if url_cache.is_negative(meta) else "done"
+            refs.append(Reference(
+                id=str(uuid4()),
+                workspace_id="w_001",  # Hardcoded for now
+                url=url,
+                note=payload.note,
+                platform=detect_platform(url),
+                title=(meta or {}).get("title"),
+                thumbnail=(meta or {}).get("thumbnail"),
+                enrichment_status=status,
+                enrichment_claimed_at=now if status == "pending" or (meta or {}).get("thumbnail") else None,
+            ))
+
+        # own session: the request-scoped one is closed once streaming starts
+        async with AsyncSessionLocal() as session:
+            session.add_all(refs)
+            try:
+                await session.flush()
+                await search.sync_references(session, [ref.id for ref in refs])
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                for ref in refs:
+                    yield _ndjson({"url": ref.url, "status": "error", "detail": str(e)})
+                return
+
+        for ref in refs:
+            if ref.enrichment_status == "pending":
+                enrichment.enqueue(ref.id, ref.url)
+            elif ref.thumbnail:
+                enrichment.enqueue_thumbnail(ref.id, ref.thumbnail)
+            yield _ndjson({
+                "url": ref.url,
+                "status": "created",
+                "id": ref.id,
+                "platform": ref.platform,
+                "title": ref.title,
+                "thumbnail": ref.thumbnail,
+                "enrichment_status": ref.enrichment_status,
+            })
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# list projection: everything the cards show, nothing else (no description/updated_at)
+_LIST_COLUMNS = (
+    Reference.id,
+    Reference.url,
+    Reference.note,
+    Reference.title,
+    Reference.thumbnail,
+    Reference.thumbnail_hash,
+    Reference.platform,
+    Reference.tags,
+    Reference.enrichment_status,
+    Reference.created_at,
+)
+
+
+def _encode_cursor(created_raw, reference_id: str) -> str:
+    raw = created_raw if isinstance(created_raw, str) else created_raw.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([raw, reference_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        raw, reference_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(raw), str(reference_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/")
-async def get_references(db: Session = Depends(get_db)):
-    """Get all references for workspace"""
+async def get_references(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    platform: Optional[str] = Query(None),
+    tag: Optional[List[str]] = Query(None, description="repeatable"),
+    tag_mode: str = Query("all", pattern="^(all|any)$", description="all: every tag; any: at least one"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    References for workspace, newest first, keyset-paginated on (created_at, id).
+    Pass next_cursor back as ?cursor= for the following page (null on the last one).
+    """
     try:
-        references = db.query(Reference).filter(
-            Reference.workspace_id == "w_001"
-        ).order_by(Reference.created_at.desc()).all()
-        
+        dialect = db.bind.dialect.name
+        # SQLite keeps created_at as text: compare the stored string as-is so the
+        # cursor round-trips exactly; other databases compare real timestamps
+        created = type_coerce(Reference.created_at, String) if dialect == "sqlite" else Reference.created_at
+        stmt = select(*_LIST_COLUMNS, created.label("created_raw")).where(Reference.workspace_id == "w_001")
+        if platform:
+            stmt = stmt.where(Reference.platform == platform)
+        if tag:
+            # tag_links index lookup instead of parsing the JSON tags column
+            stmt = stmt.where(Reference.id.in_(tag_index.tagged_ids(tag_index.REFERENCE, "w_001", tag, tag_mode)))
+        if cursor:
+            raw, last_id = _decode_cursor(cursor)
+            if dialect != "sqlite":
+                try:
+                    raw = datetime.fromisoformat(raw)
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(tuple_(created, Reference.id) < tuple_(literal(raw, created.type), literal(last_id)))
+        stmt = stmt.order_by(created.desc(), Reference.id.desc()).limit(limit + 1)
+
+        rows = (await db.execute(stmt)).all()
+        page = rows[:limit]
+        next_cursor = _encode_cursor(page[-1].created_raw, page[-1].id) if len(rows) > limit else None
+
         return {
             "ok": True,
             "references": [
@@ -213,33 +341,115 @@ async def get_references(db: Session = Depends(get_db)):
                     "note": ref.note,
                     "title": ref.title,
                     "thumbnail": ref.thumbnail,
+                    "thumbnail_local": thumbnails.local_url(ref.thumbnail_hash),
                     "platform": ref.platform,
                     "tags": ref.tags or [],
+                    "enrichment_status": ref.enrichment_status,
                     "created_at": ref.created_at
                 }
-                for ref in references
-            ]
+                for ref in page
+            ],
+            "next_cursor": next_cursor,
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get references: {str(e)}")
 
 
+@router.get("/search")
+async def search_references(
+    q: str = Query(..., min_length=1, description="words to match in url, title, note, description and tags"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Ranked full-text search (FTS5 on SQLite, tsvector on Postgres). Every word must
+    match, as a prefix; title and tag hits rank above note/description/url hits.
+    next_offset is null on the last page.
+    """
+    try:
+        rows = await search.search_references(db, "w_001", q, limit + 1, offset)
+        page = rows[:limit]
+        return {
+            "ok": True,
+            "q": q,
+            "references": [
+                {
+                    "id": ref.id,
+                    "url": ref.url,
+                    "note": ref.note,
+                    "title": ref.title,
+                    "thumbnail": ref.thumbnail,
+                    "thumbnail_local": thumbnails.local_url(ref.thumbnail_hash),
+                    "platform": ref.platform,
+                    "tags": ref.tags or [],
+                    "enrichment_status": ref.enrichment_status,
+                    "created_at": ref.created_at,
+                    "score": round(-float(ref.score), 4),
+                }
+                for ref in page
+            ],
+            "next_offset": offset + limit if len(rows) > limit else None,
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search references: {str(e)}")
+
+
+THUMBNAIL_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/thumbnails/{sha}")
+async def get_thumbnail(
+    sha: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Locally cached thumbnail by content hash (see thumbnail_local in listings).
+    Content never changes for a hash, so it is cacheable forever. An evicted file
+    is fetched again from a reference's remote thumbnail URL when possible.
+    """
+    if not thumbnails.HASH_RE.match(sha):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    etag = f'"{sha}"'
+    headers = {"Cache-Control": THUMBNAIL_CACHE_CONTROL, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # file system work off the event loop
+    if not await asyncio.to_thread(thumbnails.touch, sha):
+        remote = (await db.execute(
+            select(Reference.thumbnail).where(Reference.thumbnail_hash == sha).limit(1)
+        )).scalars().first()
+        if not remote or await thumbnails.cache_thumbnail(remote) != sha:
+            raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    media_type = await asyncio.to_thread(thumbnails.media_type, sha)
+    if media_type is None:
+        # evicted in the meantime
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    return FileResponse(thumbnails.path_for(sha), media_type=media_type, headers=headers)
+
+
 @router.put("/{reference_id}")
 async def update_reference(
     reference_id: str,
     update_data: ReferenceUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 
 ):
     """Update reference tags and note"""
     try:
-        reference = db.query(Reference).filter(
+        reference = (await db.execute(select(Reference).where(
             and_(
                 Reference.id == reference_id,
                 Reference.workspace_id == "w_001"
             )
-        ).first()
+        ))).scalars().first()
         
         if not reference:
             raise HTTPException(status_code=404, detail="Reference not found")
@@ -250,9 +460,12 @@ async def update_reference(
         
         if update_data.tags is not None:
             reference.tags = update_data.tags
+            await tag_index.set_tags_async(db, tag_index.REFERENCE, reference.id, reference.workspace_id, update_data.tags)
         
-        db.commit()
-        db.refresh(reference)
+        await db.flush()
+        await search.sync_references(db, [reference.id])
+        await db.commit()
+        await db.refresh(reference)
         
         return {
             "ok": True,
@@ -264,6 +477,7 @@ async def update_reference(
                 "title": reference.title,
                 "thumbnail": reference.thumbnail,
                 "tags": reference.tags or [],
+                "enrichment_status": reference.enrichment_status,
                 "created_at": reference.created_at
             }
         }
@@ -271,47 +485,59 @@ async def update_reference(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update reference: {str(e)}")
 
 
 @router.get("/tags")
-async def get_available_tags():
+async def get_available_tags(
+    with_counts: bool = Query(False, description="include how many references carry each tag"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """Get list of predefined tags for references"""
-    return {
+    result = {
         "ok": True,
         "tags": sorted(PREDEFINED_TAGS)
     }
+    if with_counts:
+        counts = await tag_index.facet_counts_async(db, tag_index.REFERENCE, "w_001", PREDEFINED_TAGS)
+        result["counts"] = {t: counts.get(t, 0) for t in result["tags"]}
+    return result
 
 @router.delete("/{reference_id}")
 async def delete_reference(
     reference_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a reference"""
     try:
-        reference = db.query(Reference).filter(
+        reference = (await db.execute(select(Reference).where(
             and_(
                 Reference.id == reference_id,
                 Reference.workspace_id == "w_001"
             )
-        ).first()
+        ))).scalars().first()
         
         if not reference:
             raise HTTPException(status_code=404, detail="Reference not found")
         
-        db.delete(reference)
-        db.commit()
+        await search.remove_references(db, [reference.id])
+        await tag_index.remove_tags_async(db, tag_index.REFERENCE, [reference.id])
+        await db.delete(reference)
+        await db.commit()
         
         return {"ok": True, "message": "Reference deleted"}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete: {str(e)}")
     
 
 @router.get("/categories")
-async def get_tag_categories():
+async def get_tag_categories(
+    with_counts: bool = Query(False, description="include per-tag reference counts for each category"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """Get organized tag categories for filtering"""
     categories = {
         "Content Types": ["tutorial", "inspiration", "example", "case-study", "behind-the-scenes"],
@@ -323,7 +549,15 @@ async def get_tag_categories():
         "Actions": ["steal-this", "avoid-this", "show-client", "competitor-analysis"]
     }
     
-    return {
+    result = {
         "ok": True,
         "categories": categories
-    }
\ No newline at end of file
+    }
+    if with_counts:
+        counts = await tag_index.facet_counts_async(
+            db, tag_index.REFERENCE, "w_001", [t for tags in categories.values() for t in tags]
+        )
+        result["counts"] = {
+            name: {t: counts.get(t, 0) for t in tags} for name, tags in categories.items()
+        }
+    return result
\ No newline at end of file
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from uuid import uuid4
-from ..deps import get_db, require_api_key
+from ..deps import get_db, get_read_db, require_api_key
 from .. import models, schemas
+from ..services import tags as tag_index
 
 router = APIRouter(prefix="/wins", tags=["wins"])
 
@@ -18,6 +19,7 @@ def create_win(payload: schemas.WinCreate, db: Session = Depends(get_db)):
         effort_mins=payload.effort_mins,
     )
     db.add(win)
+    tag_index.set_tags(db, tag_index.WIN, win.id, win.workspace_id, win.tags)
     db.commit()
     return {"ok": True, "win_id": win.id}
 
@@ -25,15 +27,14 @@ def create_win(payload: schemas.WinCreate, db: Session = Depends(get_db)):
 def list_wins(
     workspace_id: str = Query(..., description="Filter by workspace"),
     limit: int = Query(20, ge=1, le=100),
+    tag: list[str] | None = Query(None, description="repeatable"),
+    tag_mode: str = Query("all", pattern="^(all|any)$", description="all: every tag; any: at least one"),
     db: Session = Depends(get_db),
 ):
-    rows = (
-        db.query(models.Win)
-        .filter(models.Win.workspace_id == workspace_id)
-        .order_by(models.Win.date.desc())
-        .limit(limit)
-        .all()
-    )
+    q = db.query(models.Win).filter(models.Win.workspace_id == workspace_id)
+    if tag:
+        q = q.filter(models.Win.id.in_(tag_index.tagged_ids(tag_index.WIN, workspace_id, tag, tag_mode)))
+    rows = q.order_by(models.Win.date.desc()).limit(limit).all()
     return [
         {
             "id": r.id,
@@ -45,3 +46,12 @@ def list_wins(
         }
         for r in rows
     ]
+
+@router.get("/tags", dependencies=[Depends(require_api_key)])
+def win_tag_counts(
+    workspace_id: str = Query(..., description="Filter by workspace"),
+    db: Session = Depends(get_read_db),
+):
+    """Facet counts: how many wins carry each tag in the workspace."""
+    counts = tag_index.facet_counts(db, tag_index.WIN, workspace_id)
+    return {"workspace_id": workspace_id, "counts": dict(sorted(counts.items()))}
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from ..deps import get_db, require_api_key
+from ..deps import get_db, get_read_db, require_api_key
 from .. import models
 from pydantic import BaseModel
 from typing import Optional
@@ -76,7 +76,7 @@ def detach_kpi(
 
 
 @router.get("/{workspace_id}/kpis", dependencies=[Depends(require_api_key)])
-def list_attached_kpis(workspace_id: str, db: Session = Depends(get_db)):
+def list_attached_kpis(workspace_id: str, db: Session = Depends(get_read_db)):
     w = db.get(models.Workspace, workspace_id)
     if not w:
         raise HTTPException(404, "Workspace not found")
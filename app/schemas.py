@@ -39,6 +39,7 @@ class MetricCreate(BaseModel):
     date: date
     value: float
     source: str = "manual"
+    workspace_id: str | None = None
 
 # helper to mint ids client-side if you want
 def new_id() -> str:
@@ -0,0 +1,191 @@
+import asyncio
+import aiohttp
+from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+from .. import models
+from ..config import settings
+from ..deps import AsyncSessionLocal
+from . import scraper, search, thumbnails, url_cache
+
+# Background metadata enrichment for references. create_reference inserts the row
+# with enrichment_status="pending" and returns; a fixed pool of asyncio workers
+# (settings.enrich_workers) scrapes through the URL cache and fills in
+# title/thumbnail, retrying transient failures with exponential backoff, then
+# downloads the thumbnail into the local store (services.thumbnails).
+# Status: "pending" -> "done" (metadata found) | "failed" (none / retries exhausted).
+# Rows still pending at shutdown are scraped again on the next start. "done" rows
+# whose thumbnail isn't stored yet (thumbnail set, thumbnail_hash NULL: a transient
+# download error, or saved before the local store existed) only get the thumbnail
+# downloaded (backfill_thumbnail); a URL that doesn't serve an image is marked
+# with thumbnail_failed_at and not tried again. Every queued row carries a lease
+# (enrichment_claimed_at, settings.enrich_lease_s) so that with several server
+# processes each row is claimed, and fetched, by one.
+
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+
+async def _fetch(url: str) -> dict:
+    # looked up at call time so scraper.fetch_metadata can be swapped (bench/stubs)
+    return await scraper.fetch_metadata(url)
+
+async def _save(reference_id: str, meta: dict | None, thumbnail_hash: str | None = None,
+                thumbnail_failed_at: datetime | None = None) -> None:
+    ok = bool(meta) and not url_cache.is_negative(meta)
+    values = {"enrichment_status": "done" if ok else "failed", "enrichment_claimed_at": None}
+    if ok:
+        values.update(
+            title=meta.get("title"),
+            thumbnail=meta.get("thumbnail"),
+            thumbnail_hash=thumbnail_hash,
+            thumbnail_failed_at=thumbnail_failed_at,
+        )
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.Reference).where(models.Reference.id == reference_id).values(**values)
+        )
+        if ok:
+            await search.sync_references(db, [reference_id])
+        await db.commit()
+
+async def enrich(reference_id: str, url: str) -> dict | None:
+    """Scrape one reference (cache first) with retries, cache its thumbnail, then persist the result."""
+    meta = None
+    for attempt in range(settings.enrich_max_attempts):
+        try:
+            meta = await url_cache.get_or_fetch(url, _fetch)
+            break
+        except Exception as e:
+            if attempt + 1 >= settings.enrich_max_attempts:
+                print(f"[enrich] giving up on {url} after {attempt + 1} attempts: {e}")
+                break
+            delay = settings.enrich_backoff_s * (2 ** attempt)
+            print(f"[enrich] {url} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    thumbnail_hash = thumbnail_failed_at = None
+    if meta and meta.get("thumbnail"):
+        try:
+            thumbnail_hash = await thumbnails.store_thumbnail(meta["thumbnail"])
+            if thumbnail_hash is None:
+                thumbnail_failed_at = datetime.utcnow()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # left for backfill_thumbnail on the next start
+            print(f"[enrich] thumbnail of {url} not stored: {e}")
+    await _save(reference_id, meta, thumbnail_hash, thumbnail_failed_at)
+    return meta
+
+async def backfill_thumbnail(reference_id: str, thumbnail_url: str) -> str | None:
+    """
+    Download a "done" reference's thumbnail into the local store, without scraping
+    the page again: only thumbnail_hash (or thumbnail_failed_at) is written. If it
+    keeps failing transiently the lease is released and the next start retries.
+    """
+    values = {"enrichment_claimed_at": None}
+    for attempt in range(settings.enrich_max_attempts):
+        try:
+            sha = await thumbnails.store_thumbnail(thumbnail_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt + 1 >= settings.enrich_max_attempts:
+                print(f"[enrich] giving up on thumbnail {thumbnail_url} after {attempt + 1} attempts: {e}")
+                break
+            delay = settings.enrich_backoff_s * (2 ** attempt)
+            print(f"[enrich] thumbnail {thumbnail_url} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        if sha:
+            values["thumbnail_hash"] = sha
+        else:
+            values["thumbnail_failed_at"] = datetime.utcnow()
+        break
+    R = models.Reference
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(R).where(R.id == reference_id, R.thumbnail == thumbnail_url).values(**values))
+        if "thumbnail_hash" in values:
+            await search.sync_references(db, [reference_id])
+        await db.commit()
+    return values.get("thumbnail_hash")
+
+async def _worker() -> None:
+    while True:
+        job, reference_id, url = await _queue.get()
+        try:
+            await job(reference_id, url)
+        except Exception as e:
+            print(f"[enrich] {reference_id} failed: {e}")
+        finally:
+            _queue.task_done()
+
+def _ensure_workers() -> asyncio.Queue:
+    # lazily (re)start on the current loop, e.g. when the startup hook didn't run
+    global _queue, _workers
+    loop = asyncio.get_running_loop()
+    if _queue is None or not _workers or _workers[0].get_loop() is not loop or all(w.done() for w in _workers):
+        _queue = asyncio.Queue()
+        _workers = [loop.create_task(_worker()) for _ in range(settings.enrich_workers)]
+    return _queue
+
+def enqueue(reference_id: str, url: str) -> None:
+    """Scrape a pending reference."""
+    _ensure_workers().put_nowait((enrich, reference_id, url))
+
+def enqueue_thumbnail(reference_id: str, thumbnail_url: str) -> None:
+    """Store the thumbnail of a reference that already has its metadata."""
+    _ensure_workers().put_nowait((backfill_thumbnail, reference_id, thumbnail_url))
+
+async def _claim(column, *conditions) -> list:
+    """
+    Lease every reference matching conditions that no live process holds, in one
+    UPDATE ... RETURNING, so concurrent startups (uvicorn --workers N) split the
+    rows instead of each fetching all of them. Returns the claimed (id, column) rows.
+    """
+    R = models.Reference
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        claimed = (await db.execute(
+            update(R)
+            .where(
+                *conditions,
+                or_(R.enrichment_claimed_at.is_(None), R.enrichment_claimed_at < now - timedelta(seconds=settings.enrich_lease_s)),
+            )
+            .values(enrichment_claimed_at=now)
+            .returning(R.id, column)
+            .execution_options(synchronize_session=False)
+        )).all()
+        await db.commit()
+    return claimed
+
+async def start_enrichment() -> int:
+    """
+    Start the worker pool, requeue pending references and backfill missing
+    thumbnails. Returns the requeued count.
+    """
+    R = models.Reference
+    _ensure_workers()
+    pending = await _claim(R.url, R.enrichment_status == "pending")
+    for reference_id, url in pending:
+        enqueue(reference_id, url)
+    missing = await _claim(
+        R.thumbnail,
+        R.enrichment_status == "done",
+        R.thumbnail.isnot(None),
+        R.thumbnail_hash.is_(None),
+        R.thumbnail_failed_at.is_(None),
+    )
+    for reference_id, thumbnail_url in missing:
+        enqueue_thumbnail(reference_id, thumbnail_url)
+    if pending:
+        print(f"[enrich] requeued {len(pending)} unfinished references")
+    if missing:
+        print(f"[enrich] backfilling {len(missing)} thumbnails")
+    return len(pending) + len(missing)
+
+async def stop_enrichment() -> None:
+    global _queue, _workers
+    for w in _workers:
+        w.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _queue, _workers = None, []
+
+async def drain() -> None:
+    """Wait until everything queued so far is processed (scripts, benchmarks)."""
+    if _queue is not None:
+        await _queue.join()
@@ -0,0 +1,50 @@
+import requests
+from sqlalchemy.orm import Session
+from .. import queries
+from ..config import settings
+from .metric_writes import ensure_kpis, write_daily_metrics
+
+# Instagram profile snapshot, shared by the nightly job (app.jobs) and
+# POST /integrations/instagram/sync_profile.
+
+GRAPH_URL = "https://graph.instagram.com/v18.0"
+SOURCE = "instagram:profile"
+RECENT_POSTS = 12  # engagement is averaged over the latest posts
+KPIS = (
+    ("k_ig_followers", "Followers", "Instagram", "count"),
+    ("k_ig_following", "Following", "Instagram", "count"),
+    ("k_ig_posts", "Posts", "Instagram", "count"),
+    ("k_ig_avg_engagement", "Avg Engagement", "Instagram", "count"),
+    ("k_ig_engagement_rate", "Engagement Rate", "Instagram", "percent"),
+)
+
+def _get(path: str, **params) -> dict:
+    response = requests.get(f"{GRAPH_URL}/{path}", params=params, timeout=settings.http_timeout_s)
+    response.raise_for_status()
+    return response.json()
+
+def sync_profile_snapshot(db: Session, workspace_id: str) -> dict:
+    """Raises requests.RequestException on Graph API errors."""
+    integ = queries.integration(db, workspace_id, "instagram")
+    if not integ:
+        return {"ok": False, "reason": "not_connected"}
+
+    account_id, token = integ.external_account_id, integ.access_token
+    profile = _get(account_id, fields="followers_count,follows_count,media_count,username,account_type", access_token=token)
+    media = _get(f"{account_id}/media", fields="id,like_count,comments_count,timestamp", limit=RECENT_POSTS, access_token=token)
+
+    followers = float(profile.get("followers_count", 0))
+    posts = media.get("data", [])
+    engagement = sum((p.get("like_count", 0) or 0) + (p.get("comments_count", 0) or 0) for p in posts)
+    avg_engagement = float(engagement / len(posts)) if posts else 0.0
+    values = {
+        "k_ig_followers": followers,
+        "k_ig_following": float(profile.get("follows_count", 0)),
+        "k_ig_posts": float(profile.get("media_count", 0)),
+        "k_ig_avg_engagement": avg_engagement,
+        "k_ig_engagement_rate": float(avg_engagement / followers * 100) if followers > 0 else 0.0,
+    }
+    ensure_kpis(db, KPIS)
+    day = write_daily_metrics(db, workspace_id, values, SOURCE)
+    db.commit()
+    return {"ok": True, "date": day.isoformat(), "updated": list(values), "values": values, "profile": profile}
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import Iterator
+from sqlalchemy import select
+from .. import models
+from ..deps import ReadSessionLocal
+
+# Streaming metric export. Rows are fetched with yield_per (a server-side cursor
+# on Postgres via stream_results) and encoded chunk by chunk, so memory stays flat
+# no matter how many rows match.
+
+YIELD_PER = 2000
+COLUMNS = ["workspace_id", "kpi_id", "date", "value", "source"]
+
+def export_stmt(workspace_id: str, kpi_ids: list[str] | None, start: date | None, end: date | None):
+    M = models.Metric
+    stmt = select(M.workspace_id, M.kpi_id, M.date, M.value, M.source).where(M.workspace_id == workspace_id)
+    if kpi_ids:
+        stmt = stmt.where(M.kpi_id.in_(kpi_ids))
+    if start:
+        stmt = stmt.where(M.date >= start)
+    if end:
+        stmt = stmt.where(M.date <= end)
+    return stmt.order_by(M.kpi_id, M.date).execution_options(stream_results=True, yield_per=YIELD_PER)
+
+def _partitions(stmt) -> Iterator[list]:
+    # own (read) session: the generator outlives the request-scoped session
+    db = ReadSessionLocal()
+    try:
+        for part in db.execute(stmt).partitions():
+            yield part
+    finally:
+        db.close()
+
+def iter_csv(stmt) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for part in _partitions(stmt):
+        for ws, kpi_id, d, value, source in part:
+            writer.writerow([ws, kpi_id, d.isoformat() if d else "", value, source or ""])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+def iter_ndjson(stmt) -> Iterator[str]:
+    for part in _partitions(stmt):
+        yield "".join(
+            json.dumps({"workspace_id": ws, "kpi_id": kpi_id, "date": d.isoformat() if d else None, "value": value, "source": source}) + "\n"
+            for ws, kpi_id, d, value, source in part
+        )
@@ -0,0 +1,152 @@
+import csv
+import io
+from datetime import date
+from typing import Callable, Iterable, BinaryIO
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import Session
+from .. import models
+from .periods import period_of
+from .rollups import touch_metrics
+from .metric_writes import has_scope_index, upsert_stmt
+
+# Streaming CSV importer: the upload is decoded and parsed incrementally and rows
+# are upserted in batches with one INSERT ... ON CONFLICT (uq_metric_scope) per
+# batch, so memory stays bounded by the batch size rather than the file size.
+
+BATCH_SIZE = 5000
+SNIFF_BYTES = 64 * 1024
+REQUIRED_HEADERS = {"kpi_id", "date", "value"}
+
+def open_text(raw: BinaryIO) -> io.TextIOWrapper:
+    """
+    Wrap a binary upload for line-by-line reading. UTF-8 (with optional BOM) if the
+    first chunk decodes as UTF-8, otherwise latin-1 (same fallback as before).
+    """
+    head = raw.read(SNIFF_BYTES)
+    raw.seek(0)
+    try:
+        head.decode("utf-8-sig")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # a multi-byte char cut at the sniff boundary is still UTF-8
+        truncated = len(head) == SNIFF_BYTES and e.reason == "unexpected end of data"
+        encoding = "utf-8-sig" if truncated else "latin-1"
+    return io.TextIOWrapper(raw, encoding=encoding, errors="replace", newline="")
+
+def _update_or_insert(db: Session, batch: dict, scoped: bool) -> tuple[int, int]:
+    """Match existing points in one query and split into bulk update / insert."""
+    M = models.Metric
+    if scoped:
+        key = lambda k, d, ws: (k, d, ws)
+        where = [tuple_(M.kpi_id, M.date, M.workspace_id).in_(list(batch.keys()))]
+    else:
+        key = lambda k, d, ws: (k, d)
+        where = [tuple_(M.kpi_id, M.date).in_([(k, d) for (k, d, _) in batch.keys()]), M.workspace_id.is_(None)]
+    existing = {
+        key(k, d, ws): mid
+        for mid, k, d, ws in db.execute(select(M.id, M.kpi_id, M.date, M.workspace_id).where(*where)).all()
+    }
+    updates, inserts = [], []
+    for (k, d, ws), row in batch.items():
+        mid = existing.get(key(k, d, ws))
+        if mid is not None:
+            updates.append({"id": mid, "value": row["value"], "source": row["source"]})
+        else:
+            inserts.append(row)
+    if updates:
+        db.execute(update(M), updates)
+    if inserts:
+        db.execute(M.__table__.insert(), inserts)
+    return len(inserts), len(updates)
+
+def _flush_scoped(db: Session, batch: dict) -> tuple[int, int]:
+    """Upsert workspace-scoped rows in one statement; returns (inserted, updated)."""
+    if not has_scope_index(db):
+        # DB predates the uq_metric_scope index (migration 011 not applied yet)
+        return _update_or_insert(db, batch, scoped=True)
+    M = models.Metric
+    keys = list(batch.keys())
+    existing = db.execute(
+        select(M.kpi_id, M.date, M.workspace_id).where(tuple_(M.kpi_id, M.date, M.workspace_id).in_(keys))
+    ).all()
+    db.execute(upsert_stmt(db.get_bind().dialect.name), list(batch.values()))
+    return len(keys) - len(existing), len(existing)
+
+def _flush_unscoped(db: Session, batch: dict) -> tuple[int, int]:
+    """Rows without a workspace can't use ON CONFLICT (NULLs never conflict)."""
+    return _update_or_insert(db, batch, scoped=False)
+
+def import_metrics_csv(
+    db: Session,
+    rows: Iterable[dict],
+    workspace_id: str | None = None,
+    batch_size: int = BATCH_SIZE,
+    on_progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    Upsert metric rows from a csv.DictReader. A non-empty workspace_id column wins
+    over the workspace_id argument. Does NOT commit.
+    """
+    inserted = updated = skipped = processed = batches = 0
+    errors: list[str] = []
+    touched: set[tuple] = set()
+    scoped: dict = {}
+    unscoped: dict = {}
+
+    def flush():
+        nonlocal inserted, updated, batches
+        for part, fn in ((scoped, _flush_scoped), (unscoped, _flush_unscoped)):
+            if part:
+                i, u = fn(db, part)
+                inserted += i
+                updated += u
+                part.clear()
+        batches += 1
+        if on_progress:
+            on_progress({"batch": batches, "rows": processed, "inserted": inserted, "updated": updated, "skipped": skipped})
+
+    for i, row in enumerate(rows, start=2):  # header is line 1
+        processed += 1
+        try:
+            kpi_id = (row.get("kpi_id") or "").strip()
+            if not kpi_id:
+                skipped += 1
+                continue
+            d = date.fromisoformat((row.get("date") or "").strip())
+            v = float(row.get("value"))
+            src = (row.get("source") or "csv").strip() or "csv"
+            ws = (row.get("workspace_id") or "").strip() or workspace_id
+        except Exception as e:
+            if len(errors) < 100:
+                errors.append(f"row {i}: {e}")
+            skipped += 1
+            continue
+
+        # last row wins for duplicate keys inside a batch (ON CONFLICT can't hit a row twice)
+        target = scoped if ws else unscoped
+        target[(kpi_id, d, ws)] = {"kpi_id": kpi_id, "date": d, "value": v, "source": src, "workspace_id": ws}
+        if ws:
+            touched.add((ws, kpi_id, period_of(d)))
+        if len(scoped) + len(unscoped) >= batch_size:
+            flush()
+
+    if scoped or unscoped:
+        flush()
+
+    touch_metrics(db, touched)
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": skipped,
+        "rows": processed,
+        "batches": batches,
+        "errors_preview": errors[:5],
+    }
+
+def read_csv(text) -> csv.DictReader:
+    """DictReader over a text stream; validates the required headers."""
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or not REQUIRED_HEADERS.issubset(set(h.strip() for h in reader.fieldnames)):
+        raise ValueError(f"CSV must include headers: {sorted(REQUIRED_HEADERS)}")
+    reader.fieldnames = [h.strip() for h in reader.fieldnames]
+    return reader
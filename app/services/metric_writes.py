@@ -0,0 +1,92 @@
+from datetime import date
+from typing import Iterable
+import sqlalchemy as sa
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from .. import models
+from .rollups import touch_metrics
+
+# Shared write path for provider snapshots (YouTube, Instagram, ... via app.jobs and
+# the /integrations/*/sync routes): one daily point per (workspace, kpi, date),
+# upserted on uq_metric_scope so re-running a sync the same day overwrites instead
+# of failing, with the rollups refreshed in the same transaction.
+
+# engines known to have the unique (kpi_id, date, workspace_id) index; it is never
+# dropped, so only positive checks are cached
+_scope_index_engines: set = set()
+
+def has_scope_index(db: Session) -> bool:
+    """
+    True when metrics has a unique (kpi_id, date, workspace_id) constraint or index,
+    i.e. ON CONFLICT upserts work. Databases created before the model declared
+    uq_metric_scope only get it from migration 011.
+    """
+    engine = db.get_bind().engine
+    if engine in _scope_index_engines:
+        return True
+    insp = sa.inspect(db.connection())
+    wanted = {"kpi_id", "date", "workspace_id"}
+    found = any(set(u["column_names"]) == wanted for u in insp.get_unique_constraints("metrics")) or any(
+        i.get("unique") and set(i["column_names"]) == wanted for i in insp.get_indexes("metrics")
+    )
+    if found:
+        _scope_index_engines.add(engine)
+    return found
+
+def upsert_stmt(dialect_name: str):
+    """INSERT ... ON CONFLICT (uq_metric_scope) DO UPDATE value/source."""
+    M = models.Metric.__table__
+    ins = postgresql.insert(M) if dialect_name == "postgresql" else sqlite.insert(M)
+    return ins.on_conflict_do_update(
+        index_elements=["kpi_id", "date", "workspace_id"],
+        set_={"value": ins.excluded.value, "source": ins.excluded.source},
+    )
+
+def ensure_kpis(db: Session, kpis: Iterable[tuple]) -> None:
+    """
+    Add missing KPIs from (id, name, channel, unit) tuples (aggregation "last").
+    Insert-or-ignore, so concurrent syncs creating the same KPI don't conflict.
+    Does NOT commit.
+    """
+    K = models.KPI.__table__
+    rows = [
+        {"id": kpi_id, "name": name, "channel": channel, "unit": unit, "aggregation": "last"}
+        for kpi_id, name, channel, unit in kpis
+    ]
+    existing = set(db.execute(select(K.c.id).where(K.c.id.in_([r["id"] for r in rows]))).scalars())
+    missing = [r for r in rows if r["id"] not in existing]
+    if missing:
+        ins = postgresql.insert(K) if db.get_bind().dialect.name == "postgresql" else sqlite.insert(K)
+        db.execute(ins.on_conflict_do_nothing(index_elements=["id"]), missing)
+
+def write_daily_metrics(db: Session, workspace_id: str, values: dict[str, float], source: str, day: date | None = None) -> date:
+    """
+    Upsert one point per KPI in values for workspace_id on day (default today) and
+    refresh its rollups. Does NOT commit. Returns the day written.
+    """
+    day = day or date.today()
+    rows = [
+        {"workspace_id": workspace_id, "kpi_id": kpi_id, "date": day, "value": float(v), "source": source}
+        for kpi_id, v in values.items()
+    ]
+    if not rows:
+        return day
+    if has_scope_index(db):
+        db.execute(upsert_stmt(db.get_bind().dialect.name), rows)
+    else:
+        # DB predates the uq_metric_scope index (migration 011 not applied yet)
+        M = models.Metric
+        existing = dict(db.execute(
+            select(M.kpi_id, M.id).where(M.workspace_id == workspace_id, M.date == day, M.kpi_id.in_(list(values)))
+        ).all())
+        updates = [
+            {"id": existing[r["kpi_id"]], "value": r["value"], "source": source} for r in rows if r["kpi_id"] in existing
+        ]
+        inserts = [r for r in rows if r["kpi_id"] not in existing]
+        if updates:
+            db.execute(update(M), updates)
+        if inserts:
+            db.execute(M.__table__.insert(), inserts)
+    touch_metrics(db, [(workspace_id, kpi_id, day) for kpi_id in values])
+    return day
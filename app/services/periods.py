@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from calendar import monthrange
+from sqlalchemy import func
+
+# "YYYY-MM" period helpers shared by rollups and reports.
+
+def period_of(value) -> str:
+    """'YYYY-MM' for a date, datetime or 'YYYY-MM-DD' string."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m")
+    return str(value)[:7]
+
+def period_bounds(period: str) -> tuple[date, date]:
+    """(first_day, last_day) of a 'YYYY-MM' period. Raises ValueError if malformed."""
+    y, m = map(int, period.split("-"))
+    return date(y, m, 1), date(y, m, monthrange(y, m)[1])
+
+def month_expr(col, dialect_name: str):
+    """SQL expression bucketing a DATE column to 'YYYY-MM' on SQLite or Postgres."""
+    if dialect_name == "postgresql":
+        return func.to_char(col, "YYYY-MM")
+    return func.strftime("%Y-%m", col)
+
+def period_range(start: str, end: str) -> list[str]:
+    """Inclusive list of 'YYYY-MM' periods from start to end. Raises ValueError if malformed."""
+    y, m = map(int, start.split("-"))
+    ey, em = map(int, end.split("-"))
+    if not (1 <= m <= 12 and 1 <= em <= 12):
+        raise ValueError("month out of range")
+    out = []
+    while (y, m) <= (ey, em):
+        out.append(f"{y:04d}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+BUCKETS = ("day", "week", "month")
+
+def bucket_expr(col, bucket: str, dialect_name: str):
+    """
+    SQL expression mapping a DATE column to the first day of its bucket
+    (ISO weeks start on Monday) on SQLite or Postgres.
+    """
+    if dialect_name == "postgresql":
+        if bucket == "day":
+            return col
+        return func.date(func.date_trunc(bucket, col))
+    if bucket == "week":
+        return func.date(col, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", col)
+    return func.date(col)
@@ -0,0 +1,25 @@
+from sqlalchemy.orm import Session
+from .. import queries
+
+# Shared KPI progress (actual vs goal) used by the metrics progress endpoints and the
+# monthly report. Actuals come from metric_monthly_rollups and follow KPI.aggregation
+# ("sum" -> month total, "last" -> latest value); goals are fetched for all KPIs at once.
+
+def pct_of_target(actual: float, target: float) -> float | None:
+    return (actual / target * 100.0) if target and target > 0 else None
+
+def kpi_progress(db: Session, workspace_id: str, period: str, kpi_ids: list[str]) -> dict[str, dict]:
+    """
+    {kpi_id: {"kpi", "actual", "target", "pct_of_target"}} for every existing KPI in
+    kpi_ids, in one round trip (queries.KPI_PROGRESS).
+    """
+    if not kpi_ids:
+        return {}
+
+    params = {"workspace_id": workspace_id, "period": period, "kpi_ids": list(kpi_ids)}
+    out = {}
+    for kpi, total, last, target in db.execute(queries.KPI_PROGRESS, params).all():
+        actual = float((last if getattr(kpi, "aggregation", "sum") == "last" else total) or 0.0)
+        target = float(target or 0.0)
+        out[kpi.id] = {"kpi": kpi, "actual": actual, "target": target, "pct_of_target": pct_of_target(actual, target)}
+    return out
@@ -0,0 +1,87 @@
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from .. import models
+from .progress import kpi_progress, pct_of_target
+
+# Set-based monthly report: every KPI is resolved in a single statement instead of
+# one SUM / ORDER BY ... LIMIT 1 / Goal lookup per KPI. Aggregates come from
+# metric_monthly_rollups (see services.rollups), so the cost is O(KPIs) rows
+# regardless of how many daily points the month holds.
+
+def report_row(kpi: models.KPI, actual, target) -> dict:
+    """Shape one KPI line exactly like the monthly report payload."""
+    agg = getattr(kpi, "aggregation", "sum")
+    actual = actual or 0.0
+    target = target or 0.0
+    pct = pct_of_target(actual, target)
+    return {
+        "kpi_id": kpi.id,
+        "name": kpi.name,
+        "channel": kpi.channel,
+        "unit": kpi.unit,
+        "aggregation": agg,
+        "actual": float(actual),
+        "target": float(target),
+        "pct_of_target": float(pct) if pct is not None else None,
+    }
+
+def month_report_rows(db: Session, workspace_id: str, period: str, kpi_ids: list[str]) -> list[dict]:
+    """
+    Report lines for every KPI in kpi_ids, computed in one round trip (see
+    services.progress.kpi_progress). Rows are sorted most-behind first (None at top),
+    like the legacy report.
+    """
+    progress = kpi_progress(db, workspace_id, period, kpi_ids)
+    rows = [report_row(p["kpi"], p["actual"], p["target"]) for p in progress.values()]
+    rows.sort(key=lambda r: (r["pct_of_target"] if r["pct_of_target"] is not None else -1.0))
+    return rows
+
+def range_report_rows(db: Session, workspace_id: str, periods: list[str], kpi_ids: list[str]) -> list[dict]:
+    """
+    KPI x month matrix over consecutive periods. One scan of the rollups for the
+    whole range plus one Goal fetch; each cell follows the KPI's aggregation
+    (month total for "sum", latest value in the month for "last").
+    """
+    if not kpi_ids or not periods:
+        return []
+
+    K, R, G = models.KPI, models.MetricMonthlyRollup, models.Goal
+    kpis = db.execute(select(K).where(K.id.in_(kpi_ids)).order_by(K.id)).scalars().all()
+
+    cells = {
+        (kpi_id, period): (total, last)
+        for kpi_id, period, total, last in db.execute(
+            select(R.kpi_id, R.period, R.value_sum, R.last_value).where(
+                R.workspace_id == workspace_id,
+                R.kpi_id.in_(kpi_ids),
+                R.period >= periods[0],
+                R.period <= periods[-1],
+            )
+        ).all()
+    }
+    targets = {
+        (kpi_id, period): target
+        for kpi_id, period, target in db.execute(
+            select(G.kpi_id, G.period, func.max(G.target_value))
+            .where(G.kpi_id.in_(kpi_ids), G.period.in_(periods))
+            .group_by(G.kpi_id, G.period)
+        ).all()
+    }
+
+    rows = []
+    for kpi in kpis:
+        agg = getattr(kpi, "aggregation", "sum")
+        months = []
+        for period in periods:
+            total, last = cells.get((kpi.id, period), (None, None))
+            line = report_row(kpi, last if agg == "last" else total, targets.get((kpi.id, period)))
+            months.append({"period": period, "actual": line["actual"], "target": line["target"], "pct_of_target": line["pct_of_target"]})
+        rows.append({
+            "kpi_id": kpi.id,
+            "name": kpi.name,
+            "channel": kpi.channel,
+            "unit": kpi.unit,
+            "aggregation": agg,
+            "months": months,
+        })
+    return rows
@@ -0,0 +1,134 @@
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+from sqlalchemy import select, func, delete
+from sqlalchemy.orm import Session
+from .. import models
+from .periods import period_of, period_bounds, month_expr
+
+# Monthly rollups (metric_monthly_rollups) keep sum / count / last per
+# (workspace_id, kpi_id, period) so reports read O(KPIs) rows instead of every
+# daily point. Every metric write path calls touch_metrics() before commit, so the
+# rollup changes land in the same transaction as the metric rows.
+
+def _ranked_metrics(filters, partition_by: list):
+    """Metric rows annotated with per-partition sum/count and a recency rank."""
+    M = models.Metric
+    return (
+        select(
+            *partition_by,
+            M.value.label("value"),
+            M.date.label("date"),
+            func.sum(M.value).over(partition_by=partition_by).label("value_sum"),
+            func.count(M.value).over(partition_by=partition_by).label("value_count"),
+            func.row_number().over(
+                partition_by=partition_by,
+                order_by=(M.date.desc(), M.id.desc()),
+            ).label("rn"),
+        )
+        .where(*filters)
+        .subquery("ranked")
+    )
+
+def _rollup_row(workspace_id: str, kpi_id: str, period: str, r, now: datetime) -> dict:
+    return {
+        "workspace_id": workspace_id,
+        "kpi_id": kpi_id,
+        "period": period,
+        "value_sum": float(r.value_sum or 0.0),
+        "value_count": int(r.value_count or 0),
+        "last_value": float(r.value) if r.value is not None else None,
+        "last_date": r.date,
+        "updated_at": now,
+    }
+
+def refresh_rollups(db: Session, workspace_id: str, periods: Iterable[str], kpi_ids: Iterable[str]) -> int:
+    """
+    Recompute the rollups of kpi_ids x periods for one workspace from raw metrics,
+    in one grouped scan over the covered date range. Flushes pending metric writes
+    first; does NOT commit. Returns rows written.
+    """
+    kpi_ids = sorted(set(kpi_ids))
+    periods = sorted(set(periods))
+    if not workspace_id or not kpi_ids or not periods:
+        return 0
+    db.flush()
+
+    M, R = models.Metric, models.MetricMonthlyRollup
+    start, _ = period_bounds(periods[0])
+    _, end = period_bounds(periods[-1])
+    month = month_expr(M.date, db.get_bind().dialect.name).label("period")
+    ranked = _ranked_metrics(
+        [M.workspace_id == workspace_id, M.kpi_id.in_(kpi_ids), M.date >= start, M.date <= end],
+        [M.kpi_id.label("kpi_id"), month],
+    )
+    wanted = set(periods)
+    rows = [r for r in db.execute(select(ranked).where(ranked.c.rn == 1)).all() if r.period in wanted]
+
+    db.execute(
+        delete(R).where(R.workspace_id == workspace_id, R.kpi_id.in_(kpi_ids), R.period.in_(periods))
+    )
+    now = datetime.utcnow()
+    values = [_rollup_row(workspace_id, r.kpi_id, r.period, r, now) for r in rows]
+    if values:
+        db.execute(R.__table__.insert(), values)
+    return len(values)
+
+def touch_metrics(db: Session, points: Iterable[tuple]) -> int:
+    """
+    Refresh rollups for every (workspace_id, kpi_id, date) written in this transaction.
+    Points without a workspace are skipped (reports are always workspace-scoped).
+    """
+    groups: dict[str, tuple[set, set]] = defaultdict(lambda: (set(), set()))
+    for workspace_id, kpi_id, d in points:
+        if workspace_id and kpi_id and d:
+            kpis, periods = groups[workspace_id]
+            kpis.add(kpi_id)
+            periods.add(period_of(d))
+    written = 0
+    for workspace_id, (kpi_ids, periods) in groups.items():
+        written += refresh_rollups(db, workspace_id, periods, kpi_ids)
+    return written
+
+def rebuild_rollups(db: Session, workspace_id: str | None = None) -> int:
+    """
+    Drop and recompute all rollups (optionally for one workspace) from raw metrics.
+    Commits. Returns the number of rollup rows written.
+    """
+    M, R = models.Metric, models.MetricMonthlyRollup
+    month = month_expr(M.date, db.get_bind().dialect.name).label("period")
+
+    filters = [M.workspace_id.isnot(None)]
+    wipe = delete(R)
+    if workspace_id:
+        filters.append(M.workspace_id == workspace_id)
+        wipe = wipe.where(R.workspace_id == workspace_id)
+
+    ranked = _ranked_metrics(filters, [M.workspace_id.label("workspace_id"), M.kpi_id.label("kpi_id"), month])
+    rows = db.execute(select(ranked).where(ranked.c.rn == 1)).all()
+
+    db.execute(wipe)
+    now = datetime.utcnow()
+    values = [_rollup_row(r.workspace_id, r.kpi_id, r.period, r, now) for r in rows]
+    if values:
+        db.execute(R.__table__.insert(), values)
+    db.commit()
+    return len(values)
+
+if __name__ == "__main__":
+    # python -m app.services.rollups rebuild [--workspace-id w_001]
+    from ..deps import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Maintain metric_monthly_rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--workspace-id", default=None)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine, tables=[models.MetricMonthlyRollup.__table__])
+    db = SessionLocal()
+    try:
+        n = rebuild_rollups(db, args.workspace_id)
+        print(f"[rollups] rebuilt {n} rows" + (f" for {args.workspace_id}" if args.workspace_id else ""))
+    finally:
+        db.close()
@@ -0,0 +1,194 @@
+import asyncio
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import AsyncIterator, Awaitable, Callable
+from urllib.parse import urlparse, urljoin
+import aiohttp
+from ..http_client import get_http_session
+
+# Reference metadata scraping (title, thumbnail, platform) over the shared HTTP
+# client. fetch_metadata raises ScrapeError on transient failures so callers can
+# retry (see services.enrichment); scrape_metadata is the never-raising wrapper.
+
+class ScrapeError(Exception):
+    """Transient scrape failure (network error, timeout, 429/5xx): worth retrying."""
+
+
+def detect_platform(url: str) -> str:
+    """Detect platform from URL"""
+    try:
+        domain = urlparse(url).netloc.lower()
+
+        # Remove www. prefix
+        domain = domain.replace('www.', '')
+
+        # Platform patterns
+        if re.search(r'youtube\.com|youtu\.be', domain):
+            return 'youtube'
+        elif re.search(r'instagram\.com', domain):
+            return 'instagram'
+        elif re.search(r'tiktok\.com', domain):
+            return 'tiktok'
+        elif re.search(r'twitter\.com|x\.com', domain):
+            return 'twitter'
+        elif re.search(r'linkedin\.com', domain):
+            return 'linkedin'
+        elif re.search(r'pinterest\.com', domain):
+            return 'pinterest'
+        elif re.search(r'facebook\.com|fb\.com', domain):
+            return 'facebook'
+        else:
+            return 'website'
+
+    except Exception:
+        return 'unknown'
+
+
+# Only <head> is parsed: the body is streamed in chunks into an incremental
+# HTMLParser and the download stops at </head> (or <body>) or MAX_HEAD_BYTES.
+CHUNK_SIZE = 16 * 1024
+MAX_HEAD_BYTES = 512 * 1024
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_.:-]+)""", re.I)
+
+
+class HeadParser(HTMLParser):
+    """Collects og:title/og:image/twitter:image and <title>; sets .done at the end of <head>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: dict[str, str] = {}
+        self.title_parts: list[str] | None = None
+        self.title: str | None = None
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            a = {k.lower(): v for k, v in attrs if v is not None}
+            key = (a.get("property") or a.get("name") or "").lower()
+            if key in ("og:title", "og:image", "twitter:image") and key not in self.meta and "content" in a:
+                self.meta[key] = a["content"]
+        elif tag == "title" and self.title is None:
+            self.title_parts = []
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self.title_parts is not None:
+            self.title = "".join(self.title_parts).strip()
+            self.title_parts = None
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+
+    def result(self, url: str) -> dict:
+        """Title and absolute thumbnail URL from og:/twitter: tags, falling back to <title>."""
+        title = self.meta.get("og:title") or self.title
+        thumbnail = self.meta.get("og:image") or self.meta.get("twitter:image")
+
+        # Make thumbnail URL absolute if it's relative
+        if thumbnail and not thumbnail.startswith('http'):
+            thumbnail = urljoin(url, thumbnail)
+
+        return {
+            "title": title[:200] if title else None,  # Limit title length
+            "thumbnail": thumbnail
+        }
+
+
+def parse_metadata(html: str, url: str) -> dict:
+    """Metadata from an already-downloaded page (same rules as the streaming path)."""
+    parser = HeadParser()
+    parser.feed(html)
+    return parser.result(url)
+
+
+async def read_head(chunks: AsyncIterator[bytes], charset: str | None, url: str) -> dict:
+    """Feed body chunks to a HeadParser until </head>, <body> or MAX_HEAD_BYTES."""
+    parser = HeadParser()
+    decoder = None
+    seen = 0
+    async for chunk in chunks:
+        if decoder is None:
+            if not charset:
+                m = _CHARSET_RE.search(chunk)
+                charset = m.group(1).decode("ascii") if m else "utf-8"
+            try:
+                decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parser.feed(decoder.decode(chunk[: MAX_HEAD_BYTES - seen]))
+        seen += len(chunk)
+        if parser.done or seen >= MAX_HEAD_BYTES:
+            break
+    return parser.result(url)
+
+
+async def fetch_metadata(url: str) -> dict:
+    """
+    {"title", "thumbnail", "platform"} for url. Permanent failures (4xx, non-HTML,
+    unparsable page) come back with empty title/thumbnail; transient ones raise ScrapeError.
+    """
+    platform = detect_platform(url)
+    empty = {"title": None, "thumbnail": None, "platform": platform}
+    try:
+        async with get_http_session().get(url) as response:
+            if response.status == 429 or response.status >= 500:
+                raise ScrapeError(f"HTTP {response.status}")
+            if response.status != 200:
+                return empty
+            # skip images, video, PDFs, ... before downloading anything
+            # (aiohttp reports application/octet-stream when the header is missing)
+            if "Content-Type" in response.headers and response.content_type not in HTML_TYPES:
+                return empty
+            try:
+                metadata = await read_head(response.content.iter_chunked(CHUNK_SIZE), response.charset, url)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                raise
+            except Exception as e:
+                print(f"Scraping failed for {url}: {e}")
+                return empty
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise ScrapeError(str(e) or type(e).__name__) from e
+
+    return {**metadata, "platform": platform}
+
+
+async def scrape_metadata(url: str) -> dict:
+    """Scrape basic metadata including thumbnail and title"""
+    try:
+        metadata = await fetch_metadata(url)
+        return {"title": metadata["title"], "thumbnail": metadata["thumbnail"]}
+    except Exception as e:
+        print(f"Scraping failed for {url}: {e}")
+        return {"title": None, "thumbnail": None}
+
+
+async def scrape_many(
+    urls: list[str],
+    fetch: Callable[[str], Awaitable[dict]] = fetch_metadata,
+    concurrency: int = 16,
+    per_host: int = 4,
+) -> AsyncIterator[tuple[str, dict | None, Exception | None]]:
+    """
+    Run fetch over urls with at most `concurrency` requests in flight overall and
+    `per_host` per host. Yields (url, metadata, error) as each one finishes.
+    """
+    overall = asyncio.Semaphore(concurrency)
+    hosts: dict[str, asyncio.Semaphore] = {}
+
+    async def one(url: str):
+        host = (urlparse(url).hostname or "").lower()
+        host_sem = hosts.setdefault(host, asyncio.Semaphore(per_host))
+        async with host_sem, overall:
+            try:
+                return url, await fetch(url), None
+            except Exception as e:
+                return url, None, e
+
+    for done in asyncio.as_completed([one(u) for u in urls]):
+        yield await done
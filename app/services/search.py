@@ -0,0 +1,123 @@
+import re
+from sqlalchemy import text, DateTime, JSON
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Full-text search over references (url, title, note, description, tags).
+#   SQLite:   FTS5 table references_fts, kept in sync by the write paths below
+#             (sync_references / remove_references, called before commit).
+#   Postgres: STORED generated tsvector column references.search_vector + GIN
+#             index; the database keeps it current, so the sync calls are no-ops.
+# Other databases fall back to a LIKE scan. Objects are created by migration 008
+# (create_search_index).
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+
+# bm25 weights per FTS column (reference_id, workspace_id, url, title, note, description, tags)
+_FTS_WEIGHTS = "0.0, 0.0, 1.0, 10.0, 4.0, 2.0, 6.0"
+
+_FTS_COLUMNS = "reference_id, workspace_id, url, title, note, description, tags"
+_FTS_SOURCE = (
+    "SELECT id, workspace_id, url, coalesce(title, ''), coalesce(note, ''), "
+    "coalesce(description, ''), coalesce(tags, '') FROM \"references\""
+)
+
+_PG_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags::text, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(note, '') || ' ' || coalesce(description, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(url, '')), 'D')"
+)
+
+_LIST_COLUMNS = (
+    "r.id, r.url, r.note, r.title, r.thumbnail, r.thumbnail_hash, r.platform, r.tags, "
+    "r.enrichment_status, r.created_at"
+)
+
+
+def terms(q: str) -> list[str]:
+    """Word tokens of a user query (operators and punctuation dropped)."""
+    return _TOKEN_RE.findall(q.lower())[:MAX_TERMS]
+
+
+def create_search_index(conn: Connection) -> None:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS references_fts USING fts5("
+            f"reference_id UNINDEXED, workspace_id UNINDEXED, url, title, note, description, tags, "
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        conn.exec_driver_sql("DELETE FROM references_fts")
+        conn.exec_driver_sql(f"INSERT INTO references_fts ({_FTS_COLUMNS}) {_FTS_SOURCE}")
+    elif dialect == "postgresql":
+        conn.exec_driver_sql(
+            f'ALTER TABLE "references" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+            f"GENERATED ALWAYS AS ({_PG_VECTOR}) STORED"
+        )
+        conn.exec_driver_sql(
+            'CREATE INDEX IF NOT EXISTS ix_references_search ON "references" USING GIN (search_vector)'
+        )
+
+
+async def sync_references(db: AsyncSession, reference_ids: list[str]) -> None:
+    """Re-index these references from their current rows (call after flush, before commit)."""
+    if not reference_ids or db.bind.dialect.name != "sqlite":
+        return
+    params = {f"id_{i}": rid for i, rid in enumerate(reference_ids)}
+    in_list = ", ".join(f":{k}" for k in params)
+    await db.execute(text(f"DELETE FROM references_fts WHERE reference_id IN ({in_list})"), params)
+    await db.execute(
+        text(f"INSERT INTO references_fts ({_FTS_COLUMNS}) {_FTS_SOURCE} WHERE id IN ({in_list})"), params
+    )
+
+
+async def remove_references(db: AsyncSession, reference_ids: list[str]) -> None:
+    if not reference_ids or db.bind.dialect.name != "sqlite":
+        return
+    params = {f"id_{i}": rid for i, rid in enumerate(reference_ids)}
+    in_list = ", ".join(f":{k}" for k in params)
+    await db.execute(text(f"DELETE FROM references_fts WHERE reference_id IN ({in_list})"), params)
+
+
+async def search_references(db: AsyncSession, workspace_id: str, q: str, limit: int, offset: int) -> list:
+    """Best matches first; every query term must match (prefix match on each term)."""
+    words = terms(q)
+    if not words:
+        return []
+    params = {"workspace_id": workspace_id, "limit": limit, "offset": offset}
+    dialect = db.bind.dialect.name
+
+    if dialect == "sqlite":
+        params["match"] = " ".join(f'"{w}"*' for w in words)
+        stmt = text(
+            f"SELECT {_LIST_COLUMNS}, bm25(references_fts, {_FTS_WEIGHTS}) AS score "
+            f'FROM references_fts JOIN "references" r ON r.id = references_fts.reference_id '
+            f"WHERE references_fts MATCH :match AND references_fts.workspace_id = :workspace_id "
+            f"ORDER BY score, r.created_at DESC LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == "postgresql":
+        params["tsq"] = " & ".join(f"{w}:*" for w in words)
+        stmt = text(
+            f"SELECT {_LIST_COLUMNS}, -ts_rank_cd(r.search_vector, to_tsquery('simple', :tsq)) AS score "
+            f'FROM "references" r '
+            f"WHERE r.workspace_id = :workspace_id AND r.search_vector @@ to_tsquery('simple', :tsq) "
+            f"ORDER BY score, r.created_at DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        likes = []
+        for i, w in enumerate(words):
+            params[f"w_{i}"] = f"%{w}%"
+            likes.append(
+                f"(lower(r.url) LIKE :w_{i} OR lower(coalesce(r.title, '')) LIKE :w_{i} "
+                f"OR lower(coalesce(r.note, '')) LIKE :w_{i} OR lower(coalesce(r.description, '')) LIKE :w_{i} "
+                f"OR lower(coalesce(CAST(r.tags AS VARCHAR), '')) LIKE :w_{i})"
+            )
+        stmt = text(
+            f'SELECT {_LIST_COLUMNS}, 0 AS score FROM "references" r '
+            f"WHERE r.workspace_id = :workspace_id AND {' AND '.join(likes)} "
+            f"ORDER BY r.created_at DESC LIMIT :limit OFFSET :offset"
+        )
+    stmt = stmt.columns(tags=JSON, created_at=DateTime)
+    return (await db.execute(stmt, params)).all()
@@ -0,0 +1,79 @@
+from datetime import date
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from .. import models
+from .periods import bucket_expr
+
+# KPI time series for charts: optional SQL bucketing (day/week/month) that follows
+# KPI.aggregation, plus an LTTB downsampler to cap the number of points returned.
+
+def _iso(d) -> str:
+    return d.isoformat() if isinstance(d, date) else str(d)
+
+def raw_series(db: Session, workspace_id: str, kpi_id: str, start, end) -> list[dict]:
+    M = models.Metric
+    pts = db.execute(
+        select(M.date, M.value)
+        .where(M.workspace_id == workspace_id, M.kpi_id == kpi_id, M.date >= start, M.date <= end)
+        .order_by(M.date.asc())
+    ).all()
+    return [{"date": d, "value": float(v)} for (d, v) in pts]
+
+def bucketed_series(db: Session, workspace_id: str, kpi: models.KPI, start, end, bucket: str) -> list[dict]:
+    """
+    One row per bucket: SUM(value) for "sum" KPIs, latest value in the bucket for
+    "last" KPIs. Bucket label is the bucket's first day.
+    """
+    M = models.Metric
+    b = bucket_expr(M.date, bucket, db.get_bind().dialect.name).label("bucket")
+    filters = [M.workspace_id == workspace_id, M.kpi_id == kpi.id, M.date >= start, M.date <= end]
+
+    if getattr(kpi, "aggregation", "sum") == "last":
+        ranked = (
+            select(
+                b,
+                M.value.label("value"),
+                func.row_number().over(partition_by=b, order_by=(M.date.desc(), M.id.desc())).label("rn"),
+            )
+            .where(*filters)
+            .subquery("ranked")
+        )
+        stmt = select(ranked.c.bucket, ranked.c.value).where(ranked.c.rn == 1).order_by(ranked.c.bucket)
+    else:
+        stmt = select(b, func.sum(M.value)).where(*filters).group_by(b).order_by(b)
+
+    return [{"date": _iso(d), "value": float(v or 0.0)} for (d, v) in db.execute(stmt).all()]
+
+def lttb(points: list[dict], threshold: int) -> list[dict]:
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps first/last points and, per
+    bucket, the point forming the largest triangle with its neighbours. x is the
+    point index, so uneven date gaps don't skew selection.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return points
+
+    ys = [p["value"] for p in points]
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        # average of the next bucket
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, n)
+        span = max(nhi - nlo, 1)
+        avg_x = (nlo + nhi - 1) / 2.0
+        avg_y = sum(ys[nlo:nhi]) / span if nhi > nlo else ys[-1]
+
+        best, best_area = lo, -1.0
+        ax, ay = a, ys[a]
+        for j in range(lo, min(hi, n - 1)):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
@@ -0,0 +1,95 @@
+import json
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .. import models
+
+# Inverted tag index (tag_links) for references and wins. Reference.tags (JSON
+# list) and Win.tags (comma-separated) stay the source of truth for display; the
+# routers mirror every change into tag_links before commit so tag filters and
+# facet counts are index lookups on (workspace_id, entity, tag) instead of
+# scanning and parsing every row.
+
+REFERENCE = "reference"
+WIN = "win"
+MODES = ("all", "any")
+
+def normalize_tags(tags) -> list[str]:
+    """Lowercased, trimmed, de-duplicated tags (order kept). Accepts a list or a comma-separated string."""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    out = []
+    for t in tags:
+        t = str(t).strip().lower()
+        if t and t not in out:
+            out.append(t)
+    return out
+
+def _replace_stmts(entity: str, entity_id: str, workspace_id: str, tags) -> list:
+    L = models.TagLink
+    stmts = [delete(L).where(L.entity == entity, L.entity_id == entity_id)]
+    rows = [
+        {"workspace_id": workspace_id, "entity": entity, "entity_id": entity_id, "tag": t}
+        for t in normalize_tags(tags)
+    ]
+    if rows:
+        stmts.append(insert(L).values(rows))
+    return stmts
+
+def set_tags(db: Session, entity: str, entity_id: str, workspace_id: str, tags) -> None:
+    for stmt in _replace_stmts(entity, entity_id, workspace_id, tags):
+        db.execute(stmt)
+
+async def set_tags_async(db: AsyncSession, entity: str, entity_id: str, workspace_id: str, tags) -> None:
+    for stmt in _replace_stmts(entity, entity_id, workspace_id, tags):
+        await db.execute(stmt)
+
+async def remove_tags_async(db: AsyncSession, entity: str, entity_ids: list[str]) -> None:
+    L = models.TagLink
+    await db.execute(delete(L).where(L.entity == entity, L.entity_id.in_(entity_ids)))
+
+def tagged_ids(entity: str, workspace_id: str, tags, mode: str = "all"):
+    """
+    Subquery of entity ids carrying the tags: every tag (mode="all") or at least
+    one (mode="any"). Use as `Model.id.in_(tagged_ids(...))`.
+    """
+    L = models.TagLink
+    tags = normalize_tags(tags)
+    stmt = select(L.entity_id).where(L.workspace_id == workspace_id, L.entity == entity, L.tag.in_(tags))
+    if mode == "all" and len(tags) > 1:
+        stmt = stmt.group_by(L.entity_id).having(func.count(L.tag) == len(tags))
+    return stmt
+
+def facet_counts_stmt(entity: str, workspace_id: str, tags: list[str] | None = None):
+    """(tag, count) per tag in the workspace, optionally only for the given tags."""
+    L = models.TagLink
+    stmt = select(L.tag, func.count()).where(L.workspace_id == workspace_id, L.entity == entity)
+    if tags is not None:
+        stmt = stmt.where(L.tag.in_(normalize_tags(tags)))
+    return stmt.group_by(L.tag)
+
+def facet_counts(db: Session, entity: str, workspace_id: str, tags: list[str] | None = None) -> dict[str, int]:
+    return dict(db.execute(facet_counts_stmt(entity, workspace_id, tags)).all())
+
+async def facet_counts_async(db: AsyncSession, entity: str, workspace_id: str, tags: list[str] | None = None) -> dict[str, int]:
+    return dict((await db.execute(facet_counts_stmt(entity, workspace_id, tags))).all())
+
+def rebuild_tag_index(conn: Connection) -> int:
+    """Refill tag_links from references.tags and wins.tags (migration backfill)."""
+    L = models.TagLink.__table__
+    R = models.Reference.__table__
+    W = models.Win.__table__
+    conn.execute(L.delete())
+    rows = []
+    for rid, ws, tags in conn.execute(select(R.c.id, R.c.workspace_id, R.c.tags)):
+        if isinstance(tags, str):
+            tags = json.loads(tags or "[]")
+        rows += [{"workspace_id": ws, "entity": REFERENCE, "entity_id": rid, "tag": t} for t in normalize_tags(tags)]
+    for wid, ws, tags in conn.execute(select(W.c.id, W.c.workspace_id, W.c.tags)):
+        rows += [{"workspace_id": ws, "entity": WIN, "entity_id": wid, "tag": t} for t in normalize_tags(tags)]
+    if rows:
+        conn.execute(L.insert(), rows)
+    return len(rows)
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from collections import OrderedDict
+import aiohttp
+from ..config import settings
+from ..http_client import get_http_session
+
+# Content-addressed thumbnail store. Remote thumbnails (CDN URLs that expire) are
+# downloaded once by the enrichment workers and saved as
+# <thumbnail_dir>/<sha[:2]>/<sha256>, so identical images are stored once no matter
+# how many references/workspaces point at them. Served by GET
+# /references/thumbnails/{sha} with immutable cache headers. Total size is capped at
+# settings.thumbnail_cache_max_mb: when exceeded, least recently served files
+# (mtime, bumped on every hit) are evicted down to 90% of the cap.
+
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+CHUNK_SIZE = 64 * 1024
+
+_MAGIC = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+# remote URL -> sha, so a thumbnail shared by many saves is fetched once per process
+_seen: "OrderedDict[str, str]" = OrderedDict()
+_SEEN_MAX = 4096
+_total_bytes: int | None = None
+
+def path_for(sha: str) -> str:
+    return os.path.join(settings.thumbnail_dir, sha[:2], sha)
+
+def local_url(sha: str | None) -> str | None:
+    return f"/references/thumbnails/{sha}" if sha else None
+
+def sniff_type(head: bytes) -> str | None:
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return None
+
+def touch(sha: str) -> bool:
+    """Mark as recently used; False if the file is gone (evicted)."""
+    try:
+        os.utime(path_for(sha))
+        return True
+    except FileNotFoundError:
+        return False
+
+def media_type(sha: str) -> str | None:
+    """Sniffed image type of a stored file; None if it is gone."""
+    try:
+        with open(path_for(sha), "rb") as f:
+            return sniff_type(f.read(16)) or "application/octet-stream"
+    except FileNotFoundError:
+        return None
+
+def _scan() -> list[tuple[float, int, str]]:
+    files = []
+    for root, _, names in os.walk(settings.thumbnail_dir):
+        for name in names:
+            if HASH_RE.match(name):
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, p))
+    return files
+
+def _evict() -> int:
+    """Delete least recently used files until under 90% of the cap. Returns the new total."""
+    files = sorted(_scan())
+    total = sum(size for _, size, _ in files)
+    target = settings.thumbnail_cache_max_mb * 1024 * 1024 * 0.9
+    for _, size, p in files:
+        if total <= target:
+            break
+        try:
+            os.remove(p)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
+
+def _store(data: bytes, sha: str) -> bool:
+    """Write data under its hash (atomic rename). False if it was already stored."""
+    dest = path_for(sha)
+    if os.path.exists(dest):
+        os.utime(dest)
+        return False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dest)
+    return True
+
+async def _download(url: str) -> bytes | None:
+    """
+    The image at url, or None if it never will be (bad URL, 4xx, not an image, too
+    big). Network errors, timeouts and 5xx/429 raise aiohttp.ClientError /
+    asyncio.TimeoutError: those are worth retrying later.
+    """
+    try:
+        response = await get_http_session().get(url)
+    except aiohttp.InvalidURL:
+        return None
+    async with response:
+        if response.status >= 500 or response.status == 429:
+            response.raise_for_status()
+        if response.status != 200:
+            return None
+        if "Content-Type" in response.headers and not response.content_type.startswith("image/"):
+            return None
+        if (response.content_length or 0) > settings.thumbnail_max_bytes:
+            return None
+        buf = bytearray()
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            buf += chunk
+            if len(buf) > settings.thumbnail_max_bytes:
+                return None
+    return bytes(buf) if sniff_type(bytes(buf[:16])) else None
+
+async def cache_thumbnail(url: str | None) -> str | None:
+    """Download url into the store (once) and return its sha256, or None."""
+    try:
+        return await store_thumbnail(url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"[thumbs] download failed for {url}: {e}")
+        return None
+
+async def store_thumbnail(url: str | None) -> str | None:
+    """
+    Like cache_thumbnail, but transient download errors propagate so the caller can
+    tell them from a URL that will never serve an image (None).
+    """
+    global _total_bytes
+    if not url:
+        return None
+    sha = _seen.get(url)
+    if sha and await asyncio.to_thread(touch, sha):
+        _seen.move_to_end(url)
+        return sha
+
+    data = await _download(url)
+    if data is None:
+        return None
+    sha = hashlib.sha256(data).hexdigest()
+    added = await asyncio.to_thread(_store, data, sha)
+
+    _seen[url] = sha
+    _seen.move_to_end(url)
+    while len(_seen) > _SEEN_MAX:
+        _seen.popitem(last=False)
+
+    if added:
+        # running total (rescanned on first use and on every eviction; other
+        # workers' writes are picked up then)
+        if _total_bytes is None:
+            _total_bytes = sum(size for _, size, _ in await asyncio.to_thread(_scan))
+        else:
+            _total_bytes += len(data)
+        if _total_bytes > settings.thumbnail_cache_max_mb * 1024 * 1024:
+            # the file just stored is the newest, so it survives unless the cap is tiny
+            _total_bytes = await asyncio.to_thread(_evict)
+    return sha if os.path.exists(path_for(sha)) else None
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from .. import models
+from ..config import settings
+from ..deps import AsyncSessionLocal, AsyncReadSessionLocal
+
+# Two-tier cache for scraped URL metadata (title, thumbnail, platform), keyed by
+# normalized URL and shared across workspaces:
+#   1. in-process LRU (settings.url_cache_lru_size entries)
+#   2. url_metadata table, so restarts and other workers reuse earlier scrapes
+# Failed scrapes are cached too (ok=False) with a shorter TTL, so a dead link
+# isn't re-fetched on every save. Concurrent lookups of the same URL share one fetch.
+
+Fetch = Callable[[str], Awaitable[dict]]
+FIELDS = ("title", "thumbnail", "platform")
+
+# query params that only track the click, never change the page
+_TRACKING_PARAMS = {"igshid", "igsh", "si", "fbclid", "gclid", "feature", "ref", "ref_src"}
+
+_lru: "OrderedDict[str, tuple[datetime, dict]]" = OrderedDict()
+_inflight: dict[str, asyncio.Future] = {}
+
+def normalize_url(url: str) -> str:
+    """Lowercase scheme/host, drop www., default ports, fragments, tracking params and trailing slash."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith("utm_")
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+def url_key(url: str) -> str:
+    return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()
+
+def is_negative(meta: dict) -> bool:
+    return not meta.get("title") and not meta.get("thumbnail")
+
+def _lru_get(key: str, now: datetime) -> dict | None:
+    hit = _lru.get(key)
+    if hit is None:
+        return None
+    expires_at, meta = hit
+    if expires_at <= now:
+        del _lru[key]
+        return None
+    _lru.move_to_end(key)
+    return meta
+
+def _lru_put(key: str, expires_at: datetime, meta: dict) -> None:
+    _lru[key] = (expires_at, meta)
+    _lru.move_to_end(key)
+    while len(_lru) > settings.url_cache_lru_size:
+        _lru.popitem(last=False)
+
+async def _db_get(key: str, now: datetime) -> tuple[datetime, dict] | None:
+    async with AsyncReadSessionLocal() as db:
+        row = (await db.execute(
+            select(models.UrlMetadata).where(models.UrlMetadata.url_key == key)
+        )).scalars().first()
+    if row is None or row.expires_at <= now:
+        return None
+    return row.expires_at, {f: getattr(row, f) for f in FIELDS}
+
+async def _db_put(key: str, url: str, meta: dict, now: datetime, expires_at: datetime) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.merge(models.UrlMetadata(
+            url_key=key,
+            url=url,
+            ok=not is_negative(meta),
+            fetched_at=now,
+            expires_at=expires_at,
+            **{f: meta.get(f) for f in FIELDS},
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # another worker stored the same URL first; theirs is just as fresh
+            await db.rollback()
+
+async def _fetch_and_store(key: str, url: str, fetch: Fetch) -> dict:
+    meta = {f: v for f, v in (await fetch(url)).items() if f in FIELDS}
+    now = datetime.utcnow()
+    ttl = settings.url_cache_negative_ttl_s if is_negative(meta) else settings.url_cache_ttl_s
+    expires_at = now + timedelta(seconds=ttl)
+    _lru_put(key, expires_at, meta)
+    try:
+        await _db_put(key, normalize_url(url), meta, now, expires_at)
+    except Exception as e:
+        # the cache must never fail a save
+        print(f"[url_cache] store failed for {url}: {e}")
+    return meta
+
+async def get_or_fetch(url: str, fetch: Fetch) -> dict:
+    """
+    Cached metadata for url ({"title", "thumbnail", "platform"}), calling
+    fetch(url) only on a miss or an expired entry.
+    """
+    key = url_key(url)
+    now = datetime.utcnow()
+    meta = _lru_get(key, now)
+    if meta is not None:
+        return dict(meta)
+
+    try:
+        hit = await _db_get(key, now)
+    except Exception as e:
+        print(f"[url_cache] lookup failed for {url}: {e}")
+        hit = None
+    if hit is not None:
+        _lru_put(key, *hit)
+        return dict(hit[1])
+
+    pending = _inflight.get(key)
+    if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+        pending = asyncio.ensure_future(_fetch_and_store(key, url, fetch))
+        _inflight[key] = pending
+        pending.add_done_callback(lambda f: _inflight.pop(key) if _inflight.get(key) is f else None)
+    return dict(await asyncio.shield(pending))
+
+def peek(url: str) -> dict | None:
+    """In-process tier only (no I/O): cached metadata for url, or None."""
+    meta = _lru_get(url_key(url), datetime.utcnow())
+    return dict(meta) if meta is not None else None
+
+def clear_memory_cache() -> None:
+    _lru.clear()
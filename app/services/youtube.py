@@ -1,48 +1,92 @@
-import os
-from datetime import datetime
+import json
+import threading
+from datetime import timezone
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from sqlalchemy.orm import Session
-from .. import models
+from .. import models, queries
+from ..config import settings
+from .metric_writes import ensure_kpis, write_daily_metrics
 
-def sync_channel_snapshot(db: Session, workspace_id: str) -> dict:
-    integ = (
-        db.query(models.Integration)
-        .filter(models.Integration.workspace_id == workspace_id, models.Integration.provider == "youtube")
-        .first()
-    )
-    if not integ:
-        return {"ok": False, "reason": "not_connected"}
+# YouTube channel snapshot, shared by the nightly job (app.jobs) and
+# POST /integrations/youtube/sync_channel.
 
+SOURCE = "youtube:channels.statistics"
+KPIS = (
+    ("k_yt_subs", "Subscribers", "YouTube", "count"),
+    ("k_yt_views", "Total Views", "YouTube", "count"),
+    ("k_yt_videos", "Video Count", "YouTube", "count"),
+)
+
+# Parsed discovery document, loaded once per process: build() re-reads and re-parses
+# the ~390 KB document on every call. Each sync builds its service from this copy,
+# bound to that workspace's credentials.
+_discovery_doc: dict | None = None
+_discovery_lock = threading.Lock()
+
+def _credentials(db: Session, integ: models.Integration) -> Credentials:
+    expiry = integ.expiry
+    if expiry is not None and expiry.tzinfo is not None:
+        # google-auth compares against naive UTC
+        expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
     creds = Credentials(
         token=integ.access_token,
         refresh_token=integ.refresh_token,
         token_uri="https://oauth2.googleapis.com/token",
-        client_id=os.environ.get("GOOGLE_CLIENT_ID"),
-        client_secret=os.environ.get("GOOGLE_CLIENT_SECRET"),
-        scopes=(integ.scope.split() if integ.scope else []),
+        client_id=settings.google_client_id,
+        client_secret=settings.google_client_secret,
+        scopes=(integ.scope.split() if integ.scope else None),
+        expiry=expiry,
     )
+    if creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+        # persist the new tokens so the next sync doesn't refresh again
+        integ.access_token = creds.token
+        if creds.refresh_token:
+            integ.refresh_token = creds.refresh_token
+        integ.expiry = creds.expiry
+        db.commit()
+    return creds
+
+def _client(creds: Credentials):
+    global _discovery_doc
+    if _discovery_doc is None:
+        with _discovery_lock:
+            if _discovery_doc is None:
+                raw = get_static_doc("youtube", "v3")
+                if raw is None:
+                    # no bundled document in this client version
+                    return build("youtube", "v3", credentials=creds, cache_discovery=False)
+                doc = json.loads(raw)
+                # the client fixes up method descriptions in place the first time a
+                # resource is built; do that once here, before workers share the dict
+                build_from_document(doc, credentials=creds).channels()
+                _discovery_doc = doc
+    return build_from_document(_discovery_doc, credentials=creds)
 
-    # will auto-refresh if refresh_token is present
-    yt = build("youtube", "v3", credentials=creds, cache_discovery=False)
-    me = yt.channels().list(part="statistics", mine=True).execute()
+def sync_channel_snapshot(db: Session, workspace_id: str) -> dict:
+    integ = queries.integration(db, workspace_id, "youtube")
+    if not integ:
+        return {"ok": False, "reason": "not_connected"}
+
+    yt = _client(_credentials(db, integ))
+    if integ.external_account_id:
+        me = yt.channels().list(part="statistics", id=integ.external_account_id).execute()
+    else:
+        me = yt.channels().list(part="statistics", mine=True).execute()
     items = me.get("items", [])
     if not items:
         return {"ok": False, "reason": "no_channel"}
 
     stats = items[0]["statistics"]
-    subscribers = float(stats.get("subscriberCount", 0))
-    views = float(stats.get("viewCount", 0))
-
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    # upsert style: we’ll just insert daily snapshot rows
-    for kid, val in (("k_yt_subs", subscribers), ("k_yt_views", views)):
-        m = models.Metric(
-            workspace_id=workspace_id if hasattr(models.Metric, "workspace_id") else None,
-            kpi_id=kid, date=today, value=val, source="youtube:channels.statistics"
-        )
-        db.add(m)
-
+    values = {
+        "k_yt_subs": float(stats.get("subscriberCount", 0)),
+        "k_yt_views": float(stats.get("viewCount", 0)),
+        "k_yt_videos": float(stats.get("videoCount", 0)),
+    }
+    ensure_kpis(db, KPIS)
+    day = write_daily_metrics(db, workspace_id, values, SOURCE)
     db.commit()
-    return {"ok": True, "date": today, "subs": subscribers, "views": views}
+    return {"ok": True, "date": day.isoformat(), "updated": list(values), "values": values}
@@ -0,0 +1,111 @@
+"""
+Event-loop responsiveness under parallel reference creation.
+
+    python bench/async_references_bench.py
+
+Fires concurrent POST /references/ against a references table with many rows
+(so the duplicate check costs a real scan) while a ticker task measures how late
+the event loop wakes it up. "sync session" is the old pattern (blocking
+SQLAlchemy Session inside an async route, scraping inline); "async session" is
+the app's route on get_async_db, which queues scraping to the enrichment workers.
+Scraping is stubbed with a short asyncio.sleep.
+"""
+import asyncio, os, sys, tempfile, time, statistics
+from uuid import uuid4
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import APIRouter
+from sqlalchemy import and_
+from app.main import app
+from app.deps import engine, SessionLocal
+from app.http_client import close_http_client
+from app.migrations import ensure_schema
+from app.models import Reference, Workspace
+import app.routers.references as references
+from app.services import enrichment, scraper
+
+ROWS = 50_000
+PARALLEL = 100
+
+async def _fake_scrape(url: str) -> dict:
+    await asyncio.sleep(0.01)
+    return {"title": "stub", "thumbnail": None}
+
+async def _fake_fetch(url: str) -> dict:
+    return {**await _fake_scrape(url), "platform": "website"}
+
+scraper.fetch_metadata = _fake_fetch  # background enrichment
+
+legacy = APIRouter(prefix="/bench-legacy")
+
+@legacy.post("/")
+async def create_reference_sync(reference_data: references.ReferenceCreate):
+    db = SessionLocal()
+    try:
+        metadata = await _fake_scrape(reference_data.url)  # the old inline scrape
+        existing = db.query(Reference).filter(
+            and_(Reference.workspace_id == "w_001", Reference.url == reference_data.url)
+        ).first()
+        if existing:
+            return {"ok": False}
+        db.add(Reference(id=str(uuid4()), workspace_id="w_001", url=reference_data.url, title=metadata["title"]))
+        db.commit()
+        return {"ok": True}
+    finally:
+        db.close()
+
+app.include_router(legacy)
+
+def seed():
+    ensure_schema(engine)
+    db = SessionLocal()
+    db.merge(Workspace(id="w_001", name="bench"))
+    db.commit()
+    db.execute(
+        Reference.__table__.insert(),
+        [{"id": str(uuid4()), "workspace_id": "w_001", "url": f"https://example.com/seed/{i}", "tags": []} for i in range(ROWS)],
+    )
+    db.commit()
+    db.close()
+
+async def run(path: str) -> tuple[float, float, float]:
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append((time.perf_counter() - t - 0.005) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tick = asyncio.create_task(ticker())
+        t0 = time.perf_counter()
+        await asyncio.gather(*[
+            client.post(path, json={"url": f"https://example.com/{path}/{uuid4()}"}) for _ in range(PARALLEL)
+        ])
+        total = (time.perf_counter() - t0) * 1000
+        stop.set()
+        await tick
+    return total, max(lags), statistics.median(lags)
+
+async def main():
+    seed()
+    print(f"{ROWS} rows, {PARALLEL} parallel creates")
+    print(f"{'path':<15} {'total ms':>9} {'max lag ms':>11} {'p50 lag ms':>11}")
+    for label, path in (("sync session", "/bench-legacy/"), ("async session", "/references/")):
+        total, worst, p50 = await run(path)
+        print(f"{label:<15} {total:>9.1f} {worst:>11.1f} {p50:>11.1f}")
+    t0 = time.perf_counter()
+    await enrichment.drain()
+    print(f"enrichment queue drained in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    await enrichment.stop_enrichment()
+    await close_http_client()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Metadata extraction: full download + BeautifulSoup vs streaming head-only parse.
+
+    python bench/html_head_bench.py [fixtures_dir]
+
+Serves every *.html in fixtures_dir (saved pages) from a local aiohttp stub and
+scrapes each one ROUNDS times both ways. Without a directory a synthetic corpus
+is generated: small/medium/multi-MB pages, a page without </head>, entity-laden
+titles and a latin-1 page. Reports per-page latency, bytes read, and whether
+both extractors agree on title and thumbnail. The latin-1 page is expected to
+differ: without a charset in Content-Type, response.text() decodes it as UTF-8,
+while the head parser honours <meta charset>.
+"""
+import asyncio, os, sys, tempfile, time, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from app.http_client import get_http_session, close_http_client
+from app.services.scraper import read_head, CHUNK_SIZE
+
+ROUNDS = 5
+
+HEAD = """<!doctype html><html><head><meta charset="{charset}">
+<title>{title}</title>
+<link rel="stylesheet" href="/site.css">
+<meta property="og:title" content="{og_title}">
+<meta property="og:image" content="/img/{name}.jpg">
+<script>window.__cfg = {{"a": 1}};</script>
+{close}"""
+PARA = "<div class='post'><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p><img src='/x.png'></div>\n"
+SCRIPT = "<script>" + "var x=" + "1234567890" * 200 + ";</script>\n"
+
+def synthetic_corpus(path: str) -> None:
+    pages = {
+        "small": (HEAD.format(charset="utf-8", title="Small", og_title="Small page", name="small", close="</head><body>") + PARA * 20, "utf-8"),
+        "medium": (HEAD.format(charset="utf-8", title="Medium", og_title="Medium page", name="medium", close="</head><body>") + PARA * 3000, "utf-8"),
+        "large": (HEAD.format(charset="utf-8", title="Large", og_title="Large reel", name="large", close="</head><body>") + (PARA * 50 + SCRIPT) * 300, "utf-8"),
+        "no_head_close": (HEAD.format(charset="utf-8", title="Open head", og_title="No head close", name="open", close="<body>") + PARA * 2000, "utf-8"),
+        "entities": (HEAD.format(charset="utf-8", title="Tom &amp; Jerry &#8211; clip", og_title="Caf&eacute; &quot;menu&quot;", name="ent", close="</head><body>") + PARA * 100, "utf-8"),
+        "latin1": (HEAD.format(charset="iso-8859-1", title="Crème brûlée", og_title="Crème brûlée recette", name="latin", close="</head><body>") + PARA * 100, "latin-1"),
+    }
+    for name, (html, enc) in pages.items():
+        with open(os.path.join(path, f"{name}.html"), "wb") as f:
+            f.write((html + "</body></html>").encode(enc))
+
+def bs4_metadata(html: str, url: str) -> dict:
+    # the scraper before head-only parsing
+    soup = BeautifulSoup(html, "html.parser")
+    og_title = soup.find("meta", property="og:title")
+    title_tag = soup.find("title")
+    title = og_title.get("content") if og_title else (title_tag.text.strip() if title_tag else None)
+    og_image = soup.find("meta", property="og:image") or soup.find("meta", attrs={"name": "twitter:image"})
+    thumbnail = og_image.get("content") if og_image else None
+    if thumbnail and not thumbnail.startswith("http"):
+        thumbnail = urljoin(url, thumbnail)
+    return {"title": title[:200] if title else None, "thumbnail": thumbnail}
+
+async def full_download(url: str) -> tuple[dict, int]:
+    async with get_http_session().get(url) as response:
+        body = await response.read()
+        return bs4_metadata(await response.text(errors="replace"), url), len(body)
+
+async def head_only(url: str) -> tuple[dict, int]:
+    read = 0
+    async with get_http_session().get(url) as response:
+        async def counted():
+            nonlocal read
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                read += len(chunk)
+                yield chunk
+        return await read_head(counted(), response.charset, url), read
+
+async def main():
+    fixtures = sys.argv[1] if len(sys.argv) > 1 else None
+    if not fixtures:
+        fixtures = tempfile.mkdtemp()
+        synthetic_corpus(fixtures)
+    files = sorted(f for f in os.listdir(fixtures) if f.endswith(".html"))
+
+    async def serve(request):
+        name = request.match_info["name"]
+        with open(os.path.join(fixtures, name), "rb") as f:
+            return web.Response(body=f.read(), content_type="text/html")
+
+    srv = web.Application()
+    srv.router.add_get("/{name}", serve)
+    runner = web.AppRunner(srv, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    print(f"{len(files)} fixtures from {fixtures}, {ROUNDS} rounds each")
+    print(f"{'page':<20} {'size KB':>8} {'full ms':>8} {'head ms':>8} {'full KB':>8} {'head KB':>8}  same")
+    mismatches = 0
+    try:
+        for name in files:
+            url = f"{base}/{name}"
+            size = os.path.getsize(os.path.join(fixtures, name)) / 1024
+            row = {}
+            for label, fn in (("full", full_download), ("head", head_only)):
+                times = []
+                for _ in range(ROUNDS):
+                    t = time.perf_counter()
+                    meta, nbytes = await fn(url)
+                    times.append((time.perf_counter() - t) * 1000)
+                row[label] = (statistics.median(times), nbytes / 1024, meta)
+            same = row["full"][2] == row["head"][2]
+            mismatches += not same
+            print(f"{name:<20} {size:>8.0f} {row['full'][0]:>8.2f} {row['head'][0]:>8.2f} "
+                  f"{row['full'][1]:>8.0f} {row['head'][1]:>8.0f}  {'yes' if same else 'NO'}")
+            if not same:
+                print(f"  full: {row['full'][2]}\n  head: {row['head'][2]}")
+    finally:
+        await close_http_client()
+        await runner.cleanup()
+    print(f"{mismatches} mismatches")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Per-request overhead of rebuilding queries vs reusing prebuilt statements.
+
+    python bench/query_plan_bench.py
+
+"rebuilt" resolves columns with _pick and constructs the statement on every call
+(the old per-request pattern); "prebuilt" executes the templates in app.queries.
+Runs against an in-memory SQLite DB so SQL execution cost stays small and the
+Python-side construction/compilation overhead dominates.
+"""
+import os, sys, time
+from datetime import date
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker
+from app import models, queries
+from app.services.progress import kpi_progress
+
+WS, PERIOD = "w_bench", "2025-09"
+N = 3000
+
+def _pick(model, *names):
+    for n in names:
+        if hasattr(model, n):
+            return getattr(model, n)
+    return None
+
+def status_rebuilt(db):
+    integ = (
+        db.query(models.Integration)
+        .filter(models.Integration.provider == "youtube")
+        .filter(models.Integration.workspace_id == WS)
+        .first()
+    )
+    M = models.Metric
+    m_ws = _pick(M, "workspace_id", "workspace", "workspaceId", "ws_id")
+    m_src = _pick(M, "source")
+    m_date = _pick(M, "date", "dt", "day")
+    q = db.query(func.max(m_date)).filter(m_src.like("youtube:%")).filter(m_ws == WS)
+    return integ, q.scalar()
+
+def status_prebuilt(db):
+    return queries.integration(db, WS, "youtube"), queries.last_metric_date(db, WS, "youtube")
+
+def progress_rebuilt(db, kpi_ids):
+    R, G, K = models.MetricMonthlyRollup, models.Goal, models.KPI
+    g_kpi = _pick(G, "kpi_id", "kpi", "kpiId")
+    g_period = _pick(G, "period", "month", "mm")
+    g_target = _pick(G, "target", "goal", "target_value")
+    agg = (
+        select(R.kpi_id.label("kpi_id"), R.value_sum.label("total"), R.last_value.label("last"))
+        .where(R.workspace_id == WS, R.period == PERIOD, R.kpi_id.in_(kpi_ids))
+        .subquery("agg")
+    )
+    goal = (
+        select(g_kpi.label("kpi_id"), func.max(g_target).label("target"))
+        .where(g_kpi.in_(kpi_ids), g_period == PERIOD)
+        .group_by(g_kpi)
+        .subquery("goal")
+    )
+    stmt = (
+        select(K, agg.c.total, agg.c.last, goal.c.target)
+        .outerjoin(agg, agg.c.kpi_id == K.id)
+        .outerjoin(goal, goal.c.kpi_id == K.id)
+        .where(K.id.in_(kpi_ids))
+        .order_by(K.id)
+    )
+    return db.execute(stmt).all()
+
+def timed(fn):
+    fn()  # warm caches
+    t0 = time.perf_counter()
+    for _ in range(N):
+        fn()
+    return (time.perf_counter() - t0) / N * 1e6
+
+def main():
+    engine = create_engine("sqlite://", future=True)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    ids = [f"k_{i}" for i in range(20)]
+    for k in ids:
+        db.add(models.KPI(id=k, name=k, channel="bench", unit="count"))
+        db.add(models.MetricMonthlyRollup(workspace_id=WS, kpi_id=k, period=PERIOD, value_sum=1.0, value_count=1, last_value=1.0, last_date=date(2025, 9, 1)))
+    db.add(models.Metric(kpi_id="k_0", date=date(2025, 9, 1), value=1.0, source="youtube:x", workspace_id=WS))
+    db.commit()
+
+    print(f"{'query':<10} {'rebuilt us':>11} {'prebuilt us':>12}")
+    print(f"{'status':<10} {timed(lambda: status_rebuilt(db)):>11.1f} {timed(lambda: status_prebuilt(db)):>12.1f}")
+    print(f"{'progress':<10} {timed(lambda: progress_rebuilt(db, ids)):>11.1f} {timed(lambda: kpi_progress(db, WS, PERIOD, ids)):>12.1f}")
+
+if __name__ == "__main__":
+    main()
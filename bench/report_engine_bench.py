@@ -0,0 +1,77 @@
+"""
+Round trips and latency of the monthly workspace report as KPI count grows.
+
+    python bench/report_engine_bench.py
+
+Compares the legacy per-KPI loop (SUM or ORDER BY/LIMIT, then a Goal lookup)
+with services.report_engine.month_report_rows (backed by monthly rollups)
+on a throwaway SQLite file.
+"""
+import os, sys, tempfile, time
+from datetime import date
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.services.report_engine import month_report_rows
+from app.services.rollups import rebuild_rollups
+
+WS = "w_bench"
+PERIOD = "2025-09"
+START, END = date(2025, 9, 1), date(2025, 9, 30)
+
+def seed(db, n_kpis: int):
+    for i in range(n_kpis):
+        kid = f"k_{i}"
+        db.add(models.KPI(id=kid, name=kid, channel="bench", unit="count", aggregation="last" if i % 2 else "sum"))
+        db.add(models.Goal(id=f"g_{kid}", kpi_id=kid, period=PERIOD, target_value=1000.0))
+        for d in range(1, 31):
+            db.add(models.Metric(kpi_id=kid, date=date(2025, 9, d), value=float(d), workspace_id=WS, source="bench"))
+    db.commit()
+    rebuild_rollups(db)
+
+def legacy(db, kpi_ids):
+    M, G = models.Metric, models.Goal
+    rows = []
+    for kpi in db.query(models.KPI).filter(models.KPI.id.in_(kpi_ids)).all():
+        filters = [M.kpi_id == kpi.id, M.workspace_id == WS, M.date >= START, M.date <= END]
+        if kpi.aggregation == "last":
+            actual = db.query(M.value).filter(*filters).order_by(M.date.desc()).limit(1).scalar() or 0.0
+        else:
+            actual = db.query(func.sum(M.value)).filter(*filters).scalar() or 0.0
+        target = db.query(G.target_value).filter(G.kpi_id == kpi.id, G.period == PERIOD).scalar() or 0.0
+        rows.append((kpi.id, actual, target))
+    return rows
+
+def measure(engine, fn, repeat=20):
+    count = [0]
+    def _count(*_):
+        count[0] += 1
+    event.listen(engine, "before_cursor_execute", _count)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - t0) / repeat
+    event.remove(engine, "before_cursor_execute", _count)
+    return count[0] // repeat, elapsed * 1000
+
+def main():
+    print(f"{'kpis':>6} {'legacy trips':>13} {'legacy ms':>10} {'engine trips':>13} {'engine ms':>10}")
+    for n in (5, 10, 20, 40, 80, 160):
+        engine = create_engine(f"sqlite:///{_tmp}/bench_{n}.db", future=True)
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        seed(db, n)
+        ids = [f"k_{i}" for i in range(n)]
+        lt, lms = measure(engine, lambda: legacy(db, ids))
+        et, ems = measure(engine, lambda: month_report_rows(db, WS, PERIOD, ids))
+        print(f"{n:>6} {lt:>13} {lms:>10.2f} {et:>13} {ems:>10.2f}")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
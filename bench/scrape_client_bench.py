@@ -0,0 +1,85 @@
+"""
+Per-scrape latency: new ClientSession per URL vs the shared pooled client.
+
+    python bench/scrape_client_bench.py
+
+Starts a local aiohttp stub serving a small HTML page with og: tags (addressed as
+"localhost" so name resolution is part of the cost), then runs scrape_metadata
+sequentially and in parallel batches. "per-url session" reproduces the old
+scraper (fresh SSL context, TCPConnector and ClientSession each call); "shared
+client" is services.scraper.scrape_metadata on app.http_client. The stub is plain HTTP,
+so the TLS handshake the old path also paid per URL is not included here.
+"""
+import asyncio, os, sys, ssl, time, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+from aiohttp import web
+from bs4 import BeautifulSoup
+from app.http_client import start_http_client, close_http_client
+from app.services.scraper import scrape_metadata
+
+SEQUENTIAL = 300
+PARALLEL = 50
+BATCHES = 10
+
+PAGE = """<!doctype html><html><head>
+<title>Stub page</title>
+<meta property="og:title" content="Stub og title">
+<meta property="og:image" content="/thumb.jpg">
+</head><body>""" + "<p>lorem ipsum</p>" * 200 + "</body></html>"
+
+async def _page(request):
+    return web.Response(text=PAGE, content_type="text/html")
+
+async def scrape_per_url_session(url: str) -> dict:
+    # the scraper before the shared client
+    timeout = aiohttp.ClientTimeout(total=10)
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; Hachico/1.0)"}
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    connector = aiohttp.TCPConnector(ssl=ssl_context)
+    async with aiohttp.ClientSession(timeout=timeout, headers=headers, connector=connector) as session:
+        async with session.get(url) as response:
+            soup = BeautifulSoup(await response.text(), "html.parser")
+            og = soup.find("meta", property="og:title")
+            return {"title": og.get("content") if og else None}
+
+async def measure(scrape, base: str) -> tuple[float, float, float]:
+    seq = []
+    for i in range(SEQUENTIAL):
+        t = time.perf_counter()
+        await scrape(f"{base}/p/{i}")
+        seq.append((time.perf_counter() - t) * 1000)
+
+    t0 = time.perf_counter()
+    for b in range(BATCHES):
+        await asyncio.gather(*[scrape(f"{base}/b/{b}/{i}") for i in range(PARALLEL)])
+    par = (time.perf_counter() - t0) * 1000 / (BATCHES * PARALLEL)
+    return statistics.median(seq), statistics.quantiles(seq, n=20)[-1], par
+
+async def main():
+    srv = web.Application()
+    srv.router.add_get("/{tail:.*}", _page)
+    runner = web.AppRunner(srv, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://localhost:{port}"
+
+    await start_http_client()
+    try:
+        print(f"{SEQUENTIAL} sequential scrapes, {BATCHES} x {PARALLEL} parallel")
+        print(f"{'client':<16} {'seq p50 ms':>11} {'seq p95 ms':>11} {'parallel ms/url':>16}")
+        for label, scrape in (("per-url session", scrape_per_url_session), ("shared client", scrape_metadata)):
+            p50, p95, par = await measure(scrape, base)
+            print(f"{label:<16} {p50:>11.2f} {p95:>11.2f} {par:>16.2f}")
+    finally:
+        await close_http_client()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Concurrent read/write throughput on SQLite: stock engine vs SQLITE_PROFILE=production.
+
+    python bench/sqlite_profile_bench.py [seconds]
+
+Writer threads upsert metric points (one short transaction each, like add_metric)
+while reader threads run the monthly progress query. "defaults" is a plain
+create_engine() on the file with SQLite's rollback journal, as before the profile
+existed; "production" uses deps.make_engines() for a write pool plus a read-only
+pool (WAL, synchronous=NORMAL, mmap, cache, busy_timeout). Each run gets a fresh
+database file.
+"""
+import os, sys, tempfile, threading, time, random, statistics
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app import models, queries
+from app.config import settings
+from app.deps import make_engines
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+WRITERS = 4
+READERS = 8
+KPIS = 20
+SEED_DAYS = 365
+
+def seed(engine):
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all(models.KPI(id=f"k{i}", name=f"K{i}", channel="IG", aggregation="sum") for i in range(KPIS))
+        db.flush()
+        db.execute(models.Metric.__table__.insert(), [
+            {"workspace_id": "w_001", "kpi_id": f"k{i}", "date": date.fromordinal(date(2025, 1, 1).toordinal() + d), "value": 1.0}
+            for i in range(KPIS) for d in range(SEED_DAYS)
+        ])
+        db.commit()
+
+def run(write_engine, read_engine) -> dict:
+    WriteSession = sessionmaker(bind=write_engine)
+    ReadSession = sessionmaker(bind=read_engine)
+    stop = threading.Event()
+    stats = {"writes": 0, "reads": 0, "locked": 0}
+    read_ms = []
+    lock = threading.Lock()
+
+    def writer(n):
+        rnd = random.Random(n)
+        while not stop.is_set():
+            try:
+                with WriteSession() as db:
+                    db.execute(models.Metric.__table__.update().where(
+                        models.Metric.kpi_id == f"k{rnd.randrange(KPIS)}",
+                        models.Metric.date == date(2025, 9, rnd.randint(1, 30)),
+                    ).values(value=rnd.random() * 100))
+                    db.commit()
+                with lock:
+                    stats["writes"] += 1
+            except OperationalError:
+                with lock:
+                    stats["locked"] += 1
+
+    def reader(n):
+        kpi_ids = [f"k{i}" for i in range(KPIS)]
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                with ReadSession() as db:
+                    db.execute(queries.KPI_PROGRESS, {
+                        "workspace_id": "w_001", "period": "2025-09",
+                        "start": date(2025, 9, 1), "end": date(2025, 9, 30), "kpi_ids": kpi_ids,
+                    }).all()
+                with lock:
+                    stats["reads"] += 1
+                    read_ms.append((time.perf_counter() - t) * 1000)
+            except OperationalError:
+                with lock:
+                    stats["locked"] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    for th in threads:
+        th.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for th in threads:
+        th.join()
+
+    stats["read_p50"] = statistics.median(read_ms) if read_ms else float("nan")
+    stats["read_p95"] = statistics.quantiles(read_ms, n=20)[-1] if len(read_ms) > 1 else float("nan")
+    return stats
+
+def main():
+    tmp = tempfile.mkdtemp()
+    print(f"{WRITERS} writers, {READERS} readers, {SECONDS:.0f}s per profile, {KPIS * SEED_DAYS} seed rows")
+    print(f"{'profile':<11} {'writes/s':>9} {'reads/s':>9} {'locked':>7} {'read p50 ms':>12} {'read p95 ms':>12}")
+    for profile in ("defaults", "production"):
+        url = f"sqlite:///{tmp}/{profile}.db"
+        if profile == "defaults":
+            write_engine = read_engine = create_engine(url, future=True)
+        else:
+            settings.sqlite_profile = "production"
+            write_engine, _ = make_engines(url)
+            read_engine, _ = make_engines(url, read_only=True)
+        seed(write_engine)
+        s = run(write_engine, read_engine)
+        print(f"{profile:<11} {s['writes'] / SECONDS:>9.0f} {s['reads'] / SECONDS:>9.0f} {s['locked']:>7} "
+              f"{s['read_p50']:>12.2f} {s['read_p95']:>12.2f}")
+
+if __name__ == "__main__":
+    main()
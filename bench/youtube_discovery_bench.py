@@ -0,0 +1,82 @@
+"""
+YouTube sync latency/CPU: discovery build() per sync vs the cached discovery document.
+
+    python bench/youtube_discovery_bench.py [syncs]
+
+Starts a local stub of the YouTube Data API (channels.list only) and runs N
+sequential services.youtube.sync_channel_snapshot calls for one workspace against
+a temp SQLite database, pointing the client at the stub via client_options.
+"build per sync" is the old client setup (build("youtube", "v3",
+cache_discovery=False) every call: read + parse the bundled ~390 KB discovery
+document); "cached document" is youtube._client. Both include the DB write path.
+"""
+import functools, json, os, sys, tempfile, threading, time, statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from googleapiclient import discovery
+from app import models
+from app.deps import engine, SessionLocal
+from app.migrations import ensure_schema
+from app.services import youtube
+
+SYNCS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+BODY = json.dumps({
+    "items": [{"id": "UC_bench", "statistics": {"subscriberCount": "1200", "viewCount": "98000", "videoCount": "42"}}]
+}).encode()
+
+class FakeYouTube(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+def seed():
+    ensure_schema(engine)
+    db = SessionLocal()
+    db.add(models.Integration(workspace_id="w_bench", provider="youtube", access_token="t", external_account_id="UC_bench"))
+    db.commit()
+    db.close()
+
+def measure() -> tuple[float, float, float]:
+    times = []
+    cpu0 = time.process_time()
+    for _ in range(SYNCS):
+        db = SessionLocal()
+        t = time.perf_counter()
+        res = youtube.sync_channel_snapshot(db, "w_bench")
+        times.append((time.perf_counter() - t) * 1000)
+        db.close()
+        assert res["ok"], res
+    cpu = (time.process_time() - cpu0) * 1000 / SYNCS
+    return statistics.median(times), sum(times) / 1000, cpu
+
+def main():
+    seed()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeYouTube)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    opts = {"api_endpoint": f"http://127.0.0.1:{server.server_port}"}
+
+    cached_client = youtube._client
+    youtube.build_from_document = functools.partial(discovery.build_from_document, client_options=opts)
+    old_client = lambda creds: discovery.build("youtube", "v3", credentials=creds, cache_discovery=False, client_options=opts)
+
+    print(f"{SYNCS} sequential syncs against {opts['api_endpoint']}")
+    print(f"{'client':<16} {'p50 ms':>7} {'total s':>8} {'cpu ms/sync':>12}")
+    for name, client in (("build per sync", old_client), ("cached document", cached_client)):
+        youtube._client = client
+        p50, total, cpu = measure()
+        print(f"{name:<16} {p50:>7.1f} {total:>8.2f} {cpu:>12.1f}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
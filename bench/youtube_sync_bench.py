@@ -0,0 +1,81 @@
+"""
+Nightly YouTube sync: serial loop on one session vs the bounded worker pool.
+
+    python bench/youtube_sync_bench.py [workspaces]
+
+Seeds N YouTube integrations and swaps services.youtube.sync_channel_snapshot for
+a stand-in that sleeps LATENCY_S (discovery build + channels.list round trips)
+and writes one metric row, failing for every FAIL_EVERY-th workspace. "serial"
+is the old _sync_all_youtube loop; "pool" is jobs.run_sync with the configured
+sync_workers / youtube_sync_concurrency.
+"""
+import os, sys, tempfile, time
+from datetime import date
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models, jobs
+from app.config import settings
+from app.deps import engine, SessionLocal
+from app.migrations import ensure_schema
+from app.services import youtube
+
+WORKSPACES = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+LATENCY_S = 0.25
+FAIL_EVERY = 10
+
+def fake_sync(db, workspace_id: str) -> dict:
+    time.sleep(LATENCY_S)
+    n = int(workspace_id.split("_")[1])
+    if n % FAIL_EVERY == 0:
+        raise RuntimeError("quotaExceeded")
+    db.merge(models.Metric(workspace_id=workspace_id, kpi_id="k_yt_subs", date=date.today(), value=float(n)))
+    db.commit()
+    return {"ok": True}
+
+def serial() -> dict:
+    # the job before the worker pool
+    db = SessionLocal()
+    ok = failed = 0
+    try:
+        rows = db.query(models.Integration.workspace_id).filter(models.Integration.provider == "youtube").distinct().all()
+        for (wid,) in rows:
+            try:
+                youtube.sync_channel_snapshot(db, wid)
+                ok += 1
+            except Exception:
+                db.rollback()
+                failed += 1
+    finally:
+        db.close()
+    return {"ok": ok, "failed": failed}
+
+def seed():
+    ensure_schema(engine)
+    db = SessionLocal()
+    db.merge(models.KPI(id="k_yt_subs", name="Subscribers", channel="YouTube", aggregation="last"))
+    for i in range(WORKSPACES):
+        db.add(models.Integration(workspace_id=f"w_{i:03d}", provider="youtube", access_token="t"))
+    db.commit()
+    db.close()
+
+def main():
+    seed()
+    youtube.sync_channel_snapshot = fake_sync
+    print(f"{WORKSPACES} workspaces, {LATENCY_S * 1000:.0f} ms per sync, "
+          f"{settings.sync_workers} workers, youtube cap {settings.youtube_sync_concurrency}")
+    print(f"{'run':<8} {'wall s':>7} {'ok':>4} {'failed':>7}")
+
+    t = time.perf_counter()
+    s = serial()
+    print(f"{'serial':<8} {time.perf_counter() - t:>7.2f} {s['ok']:>4} {s['failed']:>7}")
+
+    with engine.begin() as conn:
+        conn.execute(models.Metric.__table__.delete())  # same day again
+    summary = jobs._sync_all_youtube()
+    print(f"{'pool':<8} {summary['wall_ms'] / 1000:>7.2f} {summary['ok']:>4} {summary['failed']:>7}")
+
+if __name__ == "__main__":
+    main()